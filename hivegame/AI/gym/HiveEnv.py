@@ -10,7 +10,7 @@ import numpy as np
 
 class HiveEnv(Env):
     def _state(self):
-        return represent.two_dim_representation(represent.get_adjacency_state(self.env.hive))
+        return represent.adjacency_matrix(self.env.hive)
 
     def __init__(self):
         super(HiveEnv, self).__init__()
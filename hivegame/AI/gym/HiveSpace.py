@@ -1,17 +1,17 @@
 import random
 
+import numpy as np
 from gym.spaces import Discrete
 
 from engine.environment.aienvironment import AIEnvironment
 from engine.hive import Hive
-from engine import hive_representation as represent
+from engine import move_generator
 
 
 class HiveActionSpace(Discrete):
     def _val_indices(self):
         # TODO currently only white player supported (which is indicated by 1)
-        val_moves = represent.get_all_action_vector(self.env.hive)
-        return [i for i, v in enumerate(val_moves) if v > 0]
+        return np.flatnonzero(move_generator.action_vector(self.env.hive)).tolist()
 
     def __init__(self, hive: Hive):
         self.env = AIEnvironment()
@@ -1,18 +1,60 @@
 from collections import deque
-from hivegame.arena import Arena
+from hivegame.arena import Arena, ParallelArena, SPRT
 from hivegame.AI.utils.MCTS import MCTS
+from hivegame.AI.utils.InferenceServer import InferenceServer
+from hivegame.AI.utils.ReplayBuffer import ReplayBuffer
 from hivegame.engine.environment.aienvironment import ai_environment
 import numpy as np
 from pytorch_classification.utils import Bar, AverageMeter
 
 import time, os, sys
-from pickle import Pickler, Unpickler
-from random import shuffle
+import multiprocessing
+import traceback
+from pickle import Unpickler
+from functools import partial
 import logging
 
 from hivegame.AI.alpha_player import AlphaPlayer
 
 
+# Weights given to the self-play worker processes
+SELF_PLAY_CHECKPOINT = 'selfplay.pth.tar'
+# Directory of the replay buffer in the checkpoint folder
+REPLAY_FOLDER = 'replay'
+# Weights of the new network given to the arena worker processes
+ARENA_CHECKPOINT = 'arena.pth.tar'
+
+
+def _checkpointPlayer(nnetClass, args, filename):
+    """
+    Creates an AlphaPlayer with the network loaded from the checkpoint folder. Used by the arena worker processes.
+    """
+    nnet = nnetClass()
+    nnet.load_checkpoint(folder=args.checkpoint, filename=filename)
+    return AlphaPlayer(nnet, args)
+
+
+def _selfPlayWorker(nnetClass, args, tasks, results, predictor=None):
+    """
+    Entry point of a self-play worker process. It plays the episodes taken from the tasks queue until it gets
+    None, and puts ('examples', trainExamples) of each episode to the results queue.
+
+    The worker evaluates the boards with the given predictor, e.g. a client of the inference server. If it is
+    None, it loads its own network.
+    """
+    try:
+        nnet = predictor
+        if nnet is None:
+            nnet = nnetClass()
+            nnet.load_checkpoint(folder=args.checkpoint, filename=SELF_PLAY_CHECKPOINT)
+        coach = Coach(nnet, args)
+        while tasks.get() is not None:
+            coach.mcts = MCTS(nnet, args)   # reset search tree
+            results.put(('examples', coach.executeEpisode()))
+    except Exception:
+        results.put(('error', traceback.format_exc()))
+
+
 class Coach():
     """
     This class executes the self-play + learning. It uses the functions defined
@@ -20,10 +62,10 @@ class Coach():
     """
     def __init__(self, nnet, args):
         self.nnet = nnet
-        self.pnet = self.nnet.__class__()  # the competitor network
+        self.pnet = None  # the competitor network, created when it is first needed
         self.args = args
         self.mcts = MCTS(self.nnet, self.args)
-        self.trainExamplesHistory = []    # history of examples from args.numItersForTrainExamplesHistory latest iterations
+        self.replayBuffer = None    # examples of the args.numItersForTrainExamplesHistory latest iterations
         self.skipFirstSelfPlay = False # can be overriden in loadTrainExamples()
 
     def executeEpisode(self):
@@ -43,7 +85,8 @@ class Coach():
                            the player eventually won the game, else -1.
         """
         trainExamples = []
-        board = ai_environment.getInitBoard()
+        # The episode is played on a HiveState, which is always seen from the player to move
+        board = ai_environment.getInitState()
         self.curPlayer = -1   # Black player
         episodeStep = 0
         while True:
@@ -59,7 +102,10 @@ class Coach():
 
             action = np.random.choice(len(pi), p=pi)
             board, _ = ai_environment.getNextState(canonicalBoard, 1, action)
-            r = ai_environment.getGameEnded(board, self.curPlayer)
+            # the subtree of the chosen action is reused in the next step
+            self.mcts.advance(board)
+            # result from the point of view of the current player, who has just moved
+            r = -ai_environment.getGameEnded(board, 1)
 
             if r!=0:
                 return [(x[0],x[2],r*((-1)**(x[1]!=self.curPlayer))) for x in trainExamples]
@@ -73,6 +119,10 @@ class Coach():
         only if it wins >= updateThreshold fraction of games.
         """
 
+        if self.replayBuffer is None:
+            # a fresh start, examples left in the checkpoint folder by a previous run are not used
+            self.replayBuffer = self._openReplayBuffer(self.args.checkpoint)
+            self.replayBuffer.clear()
         for i in range(1, self.args.numIters+1):
             # bookkeeping
             print('------ITER ' + str(i) + '------')
@@ -84,9 +134,8 @@ class Coach():
                 bar = Bar('Self Play', max=self.args.numEps)
                 end = time.time()
 
-                for eps in range(self.args.numEps):
-                    self.mcts = MCTS(self.nnet, self.args)   # reset search tree
-                    iterationTrainExamples += self.executeEpisode()
+                for eps, episodeExamples in enumerate(self.playEpisodes()):
+                    iterationTrainExamples += episodeExamples
 
                     # bookkeeping + plot progress
                     eps_time.update(time.time() - end)
@@ -96,37 +145,26 @@ class Coach():
                     bar.next()
                 bar.finish()
 
-                # save the iteration examples to the history 
-                self.trainExamplesHistory.append(iterationTrainExamples)
-                
-            if len(self.trainExamplesHistory) > self.args.numItersForTrainExamplesHistory:
-                print("len(trainExamplesHistory) =", len(self.trainExamplesHistory), " => remove the oldest trainExamples")
-                self.trainExamplesHistory.pop(0)
-            # backup history to a file
-            # NB! the examples were collected using the model from the previous iteration, so (i-1)  
-            self.saveTrainExamples(i-1)
-
-            # shuffle examples before training
-            trainExamples = []
-            for e in self.trainExamplesHistory:
-                trainExamples.extend(e)
-            shuffle(trainExamples)
+                # save the iteration examples to the replay buffer on disk, the oldest iteration is dropped
+                # if there are more than numItersForTrainExamplesHistory
+                self.replayBuffer.append(iterationTrainExamples)
 
             # training new network, keeping a copy of the old one
+            if self.pnet is None:
+                self.pnet = self.nnet.__class__()
             self.nnet.save_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
             self.pnet.load_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
-            pAlphaPlayer = AlphaPlayer(self.pnet, self.args)
 
-            self.nnet.train(trainExamples)
-            nAplhaPlayer = AlphaPlayer(self.nnet, self.args)
+            # the examples are shuffled and read from the replay buffer by the network
+            self.nnet.train_from_buffer(self.replayBuffer)
 
             print('PITTING AGAINST PREVIOUS VERSION')
-            arena = Arena(pAlphaPlayer, nAplhaPlayer)
-            pwins, nwins, draws = arena.playGames(self.args.arenaCompare)
+            pwins, nwins, draws, decision = self.pitAgainstPrevious()
 
             print('NEW/PREV WINS : %d / %d ; DRAWS : %d' % (nwins, pwins, draws))
 
-            if pwins+nwins == 0 or float(nwins)/(pwins+nwins) < self.args.updateThreshold:
+            if decision == SPRT.REJECT or decision == SPRT.UNDECIDED and \
+                    (pwins+nwins == 0 or float(nwins)/(pwins+nwins) < self.args.updateThreshold):
                 print('REJECTING NEW MODEL')
                 self.nnet.load_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
             else:
@@ -134,28 +172,148 @@ class Coach():
                 self.nnet.save_checkpoint(folder=self.args.checkpoint, filename=self.getCheckpointFile(i))
                 self.nnet.save_checkpoint(folder=self.args.checkpoint, filename='best.pth.tar')                
 
+    def pitAgainstPrevious(self):
+        """
+        Plays args.arenaCompare games between the previous network (self.pnet, saved as temp.pth.tar) and the new
+        one. With args.arenaWorkers > 1, the games are played in parallel by a ParallelArena, the players of which
+        load the networks from checkpoint files.
+
+        With args.arenaSPRT set, the games are stopped as soon as a sequential probability ratio test decides
+        whether the winning rate of the new network is above or below updateThreshold (by sprtDelta).
+
+        Returns:
+            pwins, nwins, draws: wins of the previous and of the new network, and the number of draws
+            decision: decision of the sequential test, SPRT.UNDECIDED if it is not used or it did not finish
+        """
+        workers = self.args.get('arenaWorkers', 1)
+        sprt = None
+        if self.args.get('arenaSPRT', False):
+            sprt = SPRT.around(self.args.updateThreshold, self.args.get('sprtDelta', 0.1),
+                               self.args.get('sprtAlpha', 0.05), self.args.get('sprtBeta', 0.05))
+        if workers <= 1:
+            arena = Arena(AlphaPlayer(self.pnet, self.args), AlphaPlayer(self.nnet, self.args))
+            if sprt is None:
+                return arena.playGames(self.args.arenaCompare) + (SPRT.UNDECIDED,)
+            result = arena.playGamesSequential(self.args.arenaCompare, sprt)
+            self._logGamesSaved(result)
+            return result
+
+        self.nnet.save_checkpoint(folder=self.args.checkpoint, filename=ARENA_CHECKPOINT)
+        nnetClass = self.nnet.__class__
+        arena = ParallelArena({
+            'previous': partial(_checkpointPlayer, nnetClass, self.args, 'temp.pth.tar'),
+            'new': partial(_checkpointPlayer, nnetClass, self.args, ARENA_CHECKPOINT),
+        }, workers)
+        if sprt is None:
+            return arena.playGames('previous', 'new', self.args.arenaCompare) + (SPRT.UNDECIDED,)
+        result = arena.playGamesSequential('previous', 'new', self.args.arenaCompare, sprt)
+        self._logGamesSaved(result)
+        return result
+
+    def _logGamesSaved(self, result):
+        pwins, nwins, draws, decision = result
+        played = pwins + nwins + draws
+        if decision != SPRT.UNDECIDED:
+            logging.info("SPRT {} the new model after {} games, {} games saved".format(
+                "accepted" if decision == SPRT.ACCEPT else "rejected", played, max(self.args.arenaCompare - played, 0)))
+        else:
+            logging.info("SPRT is undecided after {} games, falling back to updateThreshold".format(played))
+
+    def playEpisodes(self):
+        """
+        Plays numEps episodes of self-play and yields the training examples of each episode as soon as it is
+        finished.
+
+        With args.numSelfPlayWorkers > 1, the episodes are played by that many worker processes, each with its
+        own MCTS and its own copy of the current network weights. The episodes are yielded in the order they
+        finish. With args.inferenceServer set, the workers do not load the network: their boards are evaluated
+        in batches by an inference server in this process, using self.nnet.
+        """
+        workers = self.args.get('numSelfPlayWorkers', 1)
+        if workers <= 1:
+            for eps in range(self.args.numEps):
+                self.mcts = MCTS(self.nnet, self.args)   # reset search tree
+                yield self.executeEpisode()
+                logging.debug("MCTS table: {}".format(self.mcts.nodes.stats()))
+            return
+
+        # Forking a process with an initialized Keras session is not safe
+        context = multiprocessing.get_context('spawn')
+        server = None
+        predictors = [None] * workers
+        if self.args.get('inferenceServer', False):
+            server = InferenceServer(self.nnet, context, workers, ai_environment.getBoardSize(),
+                                     ai_environment.getActionSize(),
+                                     max_client_batch=max(1, self.args.get('mctsBatchSize', 1)),
+                                     max_batch_size=self.args.get('inferenceBatchSize', 32),
+                                     max_wait=self.args.get('inferenceMaxWait', 0.005))
+            predictors = [server.client(worker) for worker in range(workers)]
+            server.start()
+        else:
+            # The workers load the weights from a checkpoint file.
+            self.nnet.save_checkpoint(folder=self.args.checkpoint, filename=SELF_PLAY_CHECKPOINT)
+        tasks = context.Queue()
+        results = context.Queue()
+        for eps in range(self.args.numEps):
+            tasks.put(eps)
+        for _ in range(workers):
+            tasks.put(None)     # no more episodes
+        processes = [context.Process(target=_selfPlayWorker,
+                                     args=(self.nnet.__class__, self.args, tasks, results, predictor), daemon=True)
+                     for predictor in predictors]
+        for process in processes:
+            process.start()
+        try:
+            for eps in range(self.args.numEps):
+                status, payload = results.get()
+                if status == 'error':
+                    raise RuntimeError("Self-play worker failed:\n{}".format(payload))
+                yield payload
+        finally:
+            for process in processes:
+                process.join(timeout=1)
+                if process.is_alive():
+                    process.terminate()
+            if server:
+                server.stop()
+
     def getCheckpointFile(self, iteration):
         return 'checkpoint_' + str(iteration) + '.pth.tar'
 
-    def saveTrainExamples(self, iteration):
-        folder = self.args.checkpoint
-        if not os.path.exists(folder):
-            os.makedirs(folder)
-        filename = os.path.join(folder, self.getCheckpointFile(iteration)+".examples")
-        with open(filename, "wb+") as f:
-            Pickler(f).dump(self.trainExamplesHistory)
+    def _openReplayBuffer(self, folder):
+        return ReplayBuffer(os.path.join(folder, REPLAY_FOLDER), self.args.numItersForTrainExamplesHistory,
+                            ai_environment.getActionSize())
 
     def loadTrainExamples(self):
+        """
+        Continues from the replay buffer of the load folder, or from the pickled example history of the model. The
+        examples are copied into the replay buffer of the checkpoint folder, which replaces the examples stored
+        there before, and the new examples are written there too.
+        """
+        replayFolder = os.path.join(self.args.load_folder_file[0], REPLAY_FOLDER)
         modelFile = os.path.join(self.args.load_folder_file[0], self.args.load_folder_file[1])
         examplesFile = modelFile+".examples"
-        if not os.path.isfile(examplesFile):
+        sameFolder = os.path.isdir(replayFolder) and \
+            os.path.realpath(replayFolder) == os.path.realpath(os.path.join(self.args.checkpoint, REPLAY_FOLDER))
+        if os.path.isdir(replayFolder) and len(self._openReplayBuffer(self.args.load_folder_file[0])) > 0:
+            print("Replay buffer found. Use it.")
+            self.replayBuffer = self._openReplayBuffer(self.args.checkpoint)
+            if not sameFolder:
+                self.replayBuffer.clear()
+                self.replayBuffer.extend(self._openReplayBuffer(self.args.load_folder_file[0]))
+        elif os.path.isfile(examplesFile):
+            print("File with trainExamples found. Read it.")
+            with open(examplesFile, "rb") as f:
+                trainExamplesHistory = Unpickler(f).load()
+            self.replayBuffer = self._openReplayBuffer(self.args.checkpoint)
+            self.replayBuffer.clear()
+            for iterationTrainExamples in trainExamplesHistory:
+                self.replayBuffer.append(iterationTrainExamples)
+        else:
             print(examplesFile)
             r = input("File with trainExamples not found. Continue? [y|n]")
             if r != "y":
                 sys.exit()
-        else:
-            print("File with trainExamples found. Read it.")
-            with open(examplesFile, "rb") as f:
-                self.trainExamplesHistory = Unpickler(f).load()
-            # examples based on the model were already collected (loaded)
-            self.skipFirstSelfPlay = True
+            return
+        # examples based on the model were already collected (loaded)
+        self.skipFirstSelfPlay = True
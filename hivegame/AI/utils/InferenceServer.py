@@ -0,0 +1,156 @@
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+class _SharedBuffers(object):
+    """
+    Boards, policies and values of the requests of one client, in shared memory. The worker process writes the
+    boards and the server writes the answer in place, so only the number of boards goes through the queues.
+    """
+
+    def __init__(self, context, board_shape, action_size, capacity):
+        self.board_shape = tuple(board_shape)
+        self.action_size = action_size
+        self.capacity = capacity
+        self._raw = (context.RawArray('f', capacity * int(np.prod(board_shape))),
+                     context.RawArray('f', capacity * action_size),
+                     context.RawArray('f', capacity))
+        self._views = None
+
+    def __getstate__(self):
+        # the views are created again in the other process, over the same memory
+        state = dict(self.__dict__)
+        state['_views'] = None
+        return state
+
+    def views(self):
+        """
+        :return: The boards, policies and values arrays, with room for capacity boards
+        """
+        if self._views is None:
+            boards, pis, vs = (np.frombuffer(raw, dtype=np.float32) for raw in self._raw)
+            self._views = (boards.reshape((self.capacity,) + self.board_shape),
+                           pis.reshape(self.capacity, self.action_size), vs)
+        return self._views
+
+
+class RemotePredictor(object):
+    """
+    Predictor of a worker process. It sends the boards to the :class:`InferenceServer` and waits for the answer,
+    so it can be used by MCTS in place of the neural network. It can be passed to a new process.
+    """
+
+    def __init__(self, client_id, requests, responses, buffers: _SharedBuffers):
+        self.client_id = client_id
+        self._requests = requests
+        self._responses = responses
+        self._buffers = buffers
+
+    def predict(self, board):
+        pis, vs = self.predict_batch(np.asarray(board)[np.newaxis])
+        return pis[0], vs[0]
+
+    def predict_batch(self, boards):
+        boards = np.asarray(boards)
+        count = len(boards)
+        if count > self._buffers.capacity:
+            raise ValueError("{} boards requested, at most {} fit in the shared buffers".format(
+                count, self._buffers.capacity))
+        board_buffer, pi_buffer, v_buffer = self._buffers.views()
+        board_buffer[:count] = boards
+        self._requests.put((self.client_id, count))
+        self._responses.get()
+        return pi_buffer[:count].copy(), v_buffer[:count].copy()
+
+
+class InferenceServer(object):
+    """
+    Evaluates the boards of several worker processes with one neural network.
+
+    The requests of the workers are collected into one batch until it has max_batch_size boards, or max_wait
+    seconds passed since the first request of the batch. The batch is evaluated with a single predict_batch call
+    of the network, running in a thread of the owner process. The boards and the answers are exchanged in shared
+    memory, the queues only carry the number of boards of the requests.
+    """
+
+    def __init__(self, predictor, context, client_count, board_shape, action_size, max_client_batch=1,
+                 max_batch_size=32, max_wait=0.005):
+        """
+        :param predictor: Neural network, see :class:`NeuralNet`
+        :param context: multiprocessing context of the worker processes
+        :param client_count: number of :class:`RemotePredictor` objects to create
+        :param board_shape: Shape of one board
+        :param action_size: Length of the policy vectors
+        :param max_client_batch: Number of boards a client can send in one request, e.g. args.mctsBatchSize
+        :param max_batch_size: Number of boards after which the batch is evaluated without waiting for more
+        :param max_wait: Seconds to wait for more requests after the first request of a batch
+        """
+        self._predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._requests = context.Queue()
+        self._responses = [context.Queue() for _ in range(client_count)]
+        self._buffers = [_SharedBuffers(context, board_shape, action_size, max_client_batch)
+                         for _ in range(client_count)]
+        self._thread = None
+        self.batch_count = 0
+        self.board_count = 0
+
+    def client(self, client_id: int) -> RemotePredictor:
+        return RemotePredictor(client_id, self._requests, self._responses[client_id], self._buffers[client_id])
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._requests.put(None)
+        self._thread.join()
+        logging.debug("Inference server evaluated {} boards in {} batches".format(self.board_count, self.batch_count))
+
+    def _next_batch(self):
+        """
+        :return: The list of (client id, number of boards) requests of the next batch, and whether the server
+                 should stop.
+        """
+        request = self._requests.get()
+        if request is None:
+            return [], True
+        batch = [request]
+        size = request[1]
+        deadline = time.time() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                request = self._requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+            size += request[1]
+        return batch, False
+
+    def _serve(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if not batch:
+                continue
+            boards = np.concatenate([self._buffers[client_id].views()[0][:count] for client_id, count in batch])
+            pis, vs = self._predictor.predict_batch(boards)
+            self.batch_count += 1
+            self.board_count += len(boards)
+            offset = 0
+            for client_id, count in batch:
+                _boards, pi_buffer, v_buffer = self._buffers[client_id].views()
+                pi_buffer[:count] = pis[offset:offset + count]
+                v_buffer[:count] = np.ravel(vs)[offset:offset + count]
+                offset += count
+                self._responses[client_id].put(count)
@@ -3,17 +3,90 @@ import math
 import numpy as np
 
 from engine.hive_utils import Player
-from hivegame.engine.environment.aienvironment import ai_environment
+from hivegame.engine.environment.aienvironment import ai_environment, HiveState
 
 from hivegame.engine import hive_representation as represent
+from hivegame.AI.utils.TranspositionTable import TranspositionTable, LRU
 
 EPS = 1e-8
 
 def _debug_board(canonicalBoard):
-    hive  = represent.load_state_with_player(canonicalBoard, Player.WHITE)
+    if isinstance(canonicalBoard, HiveState):
+        hive = canonicalBoard.hive
+    else:
+        hive = represent.load_state_with_player(canonicalBoard, Player.WHITE)
     logging.debug("\n{}".format(hive))
 
 
+class MCTSNode(object):
+    """
+    Statistics of the edges of one node of the search tree. The arrays are indexed by the valid actions of the
+    node only, not by the whole action space. Terminal nodes have no actions.
+    """
+
+    def __init__(self, actions: np.ndarray, prior: np.ndarray, game_ended: int = 0):
+        self.actions = actions                              # action numbers of the valid actions
+        self.prior = prior                                  # P: initial policy returned by the neural net
+        self.visits = np.zeros(len(actions))                # N: times the edge was visited
+        self.value_sum = np.zeros(len(actions))             # W: sum of the values below the edge
+        self.q = np.zeros(len(actions))                     # Q: mean value of the edge
+        self.visit_count = 0                                # times the node was visited
+        # keys of the canonical boards after the actions, filled lazily. Only the keys are kept, the boards are
+        # computed again on every descent, so the memory of a node does not depend on the size of the states.
+        self.children = [None] * len(actions)
+        self.game_ended = game_ended                        # result of game.getGameEnded for the board
+
+    @staticmethod
+    def terminal(game_ended: int) -> 'MCTSNode':
+        return MCTSNode(np.zeros(0, dtype=np.int64), np.zeros(0), game_ended)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        :return: Approximate size of the statistics and of the child keys
+        """
+        return self.actions.nbytes + self.prior.nbytes + self.visits.nbytes + self.value_sum.nbytes + \
+            self.q.nbytes + 8 * len(self.children) + \
+            sum(len(key) for key in self.children if isinstance(key, str))
+
+    def select(self, cpuct: float) -> int:
+        """
+        :return: Index of the edge with the highest upper confidence bound. Unvisited edges have a Q value of 0.
+        """
+        u = self.q + cpuct * self.prior * math.sqrt(self.visit_count + EPS) / (1 + self.visits)
+        return int(np.argmax(u))
+
+    def update(self, index: int, value: float) -> None:
+        self.visits[index] += 1
+        self.value_sum[index] += value
+        self.q[index] = self.value_sum[index] / self.visits[index]
+        self.visit_count += 1
+
+    def add_virtual_loss(self, index: int) -> None:
+        """
+        Counts a lost visit on the edge while the evaluation of a leaf below it is pending, so that the other
+        paths of the same batch are steered away from it. It is taken back by :func:`revert_virtual_loss`.
+        """
+        self.visits[index] += 1
+        self.value_sum[index] -= 1
+        self.q[index] = self.value_sum[index] / self.visits[index]
+        self.visit_count += 1
+
+    def revert_virtual_loss(self, index: int) -> None:
+        self.visits[index] -= 1
+        self.value_sum[index] += 1
+        self.q[index] = self.value_sum[index] / self.visits[index] if self.visits[index] else 0
+        self.visit_count -= 1
+
+    def action_counts(self) -> np.ndarray:
+        """
+        :return: Visit counts over the whole action space
+        """
+        counts = np.zeros(ai_environment.getActionSize())
+        counts[self.actions] = self.visits
+        return counts
+
+
 class MCTS():
     """
     Monte carlo tree search algorithm
@@ -22,13 +95,25 @@ class MCTS():
     def __init__(self, predictor, args):
         self.predictor = predictor
         self.args = args
-        self.Qsa = {}       # stores Q values for s,a (as defined in the paper)
-        self.visit_number_s_a = {}       # stores #times edge s,a was visited
-        self.visit_number_s = {}        # stores #times board s was visited
-        self.policy_s = {}        # stores initial policy (returned by neural net)
+        # stores the MCTSNode of the expanded and the terminal boards
+        self.nodes = TranspositionTable(args.get('mctsTableSize'), args.get('mctsEviction', LRU))
 
-        self.game_ended_s = {}        # stores game.getGameEnded ended for board s
-        self.valid_moves_s = {}        # stores game.getValidMoves for board s
+    def advance(self, canonicalBoard):
+        """
+        Makes canonicalBoard the root of the tree, e.g. after actions were played. The statistics of the subtree
+        below it are kept for the next searches, the nodes which can not be reached from it any more are released.
+        """
+        root = ai_environment.stringRepresentation(canonicalBoard)
+        reachable = set()
+        to_visit = [root]
+        while to_visit:
+            s = to_visit.pop()
+            if s in reachable:
+                continue
+            reachable.add(s)
+            if s in self.nodes:
+                to_visit.extend(key for key in self.nodes[s].children if key is not None)
+        self.nodes.retain(reachable)
 
     def getActionProb(self, canonicalBoard, temp=1):
         """
@@ -36,32 +121,49 @@ class MCTS():
         canonicalBoard.
 
         Parameters:
-            canonicalBoard:  Canonical representation of the board.
+            canonicalBoard:  Canonical representation of the board, or a HiveState. Searching from a
+                             HiveState keeps real game states in the tree, which avoids decoding the
+                             board on every step.
 
         Returns:
             probs: a policy vector where the probability of the ith action is
-                   proportional to visit_number_s_a[(s,a)]**(1./temp)
+                   proportional to the visit count of the edge**(1./temp)
         """
-        for i in range(self.args.numMCTSSims):
-            self.search(canonicalBoard)
-
         s = ai_environment.stringRepresentation(canonicalBoard)
+        # the root is never evicted during the search
+        self.nodes.protect(s)
+        try:
+            batch_size = min(self.args.get('mctsBatchSize', 1), self.args.numMCTSSims)
+            if batch_size > 1:
+                simulations = 0
+                while simulations < self.args.numMCTSSims:
+                    simulations += self.search_batch(canonicalBoard,
+                                                     min(batch_size, self.args.numMCTSSims - simulations))
+            else:
+                for i in range(self.args.numMCTSSims):
+                    self.search(canonicalBoard)
+
+            root = self.nodes[s] if s in self.nodes else None
+            if root is not None and root.game_ended == 0 and root.visit_count == 0:
+                # the simulations only expanded the root, one more is needed to visit an action
+                self.search(canonicalBoard)
+        finally:
+            self.nodes.release(s)
 
         # The number of visits - during the search() - for each available state from the current one
-        counts = [self.visit_number_s_a[(s, a)] if (s, a) in self.visit_number_s_a else 0 for a in range(ai_environment.getActionSize())]
+        counts = self.nodes[s].action_counts() if s in self.nodes else np.zeros(ai_environment.getActionSize())
 
         if temp==0:
             bestA = np.argmax(counts)
-            probs = [0]*len(counts)
+            probs = np.zeros(len(counts))
             probs[bestA]=1
             return probs
 
-        counts = [x**(1./temp) for x in counts]
-        if sum(counts) <= 0:
+        counts = counts**(1./temp)
+        if np.sum(counts) <= 0:
             logging.error("Algorithm failure")
             _debug_board(canonicalBoard)
-        probs = [x/float(sum(counts)) for x in counts]
-        return probs
+        return counts / float(np.sum(counts))
 
     def search(self, canonicalBoard):
         """
@@ -72,8 +174,8 @@ class MCTS():
         Once a leaf node is found, the neural network is called to return an
         initial policy P and a value v for the state. This value is propagated
         up the search path. In case the leaf node is a terminal state, the
-        outcome is propagated up the search path. The values of Ns, Nsa, Qsa are
-        updated.
+        outcome is propagated up the search path. The values of N, W, Q of the
+        nodes are updated.
 
         NOTE: the return values are the negative of the value of the current
         state. This is done since v is in [-1,1] and if v is the value of a
@@ -85,65 +187,132 @@ class MCTS():
 
         s = ai_environment.stringRepresentation(canonicalBoard)
 
-        if s not in self.game_ended_s:
-            self.game_ended_s[s] = ai_environment.getGameEnded(canonicalBoard, 1)
-        if self.game_ended_s[s]!=0:
-            # terminal node
-            return -self.game_ended_s[s]
-
-        if s not in self.policy_s:
+        node = self.nodes.get(s)
+        if node is None:
+            game_ended = ai_environment.getGameEnded(canonicalBoard, 1)
+            if game_ended != 0:
+                # terminal node
+                self.nodes.put(s, MCTSNode.terminal(game_ended))
+                return -game_ended
             # leaf node
-            self.policy_s[s], value = self.predictor.predict(canonicalBoard)
-            valids = ai_environment.getValidMoves(canonicalBoard, 1)
-            self.policy_s[s] = self.policy_s[s] * valids      # masking invalid moves
-            sum_current_policy = np.sum(self.policy_s[s])
-            if sum_current_policy > 0:
-                self.policy_s[s] /= sum_current_policy    # re-normalize
-            else:
-                # if all valid moves were masked make all valid moves equally probable
-                
-                # NB! All valid moves may be masked if either your NNet architecture is insufficient or you've get overfitting or something else.
-                # If you have got dozens or hundreds of these messages you should pay attention to your NNet and/or training process.
-                print("All valid moves were masked, do workaround.")
-                self.policy_s[s] = self.policy_s[s] + valids
-                self.policy_s[s] /= np.sum(self.policy_s[s])
-
-            self.valid_moves_s[s] = valids
-            self.visit_number_s[s] = 0
+            policy, value = self.predictor.predict(ai_environment.getEncodedBoard(canonicalBoard))
+            self._expand(s, canonicalBoard, policy)
             return -value
-
-        valids = self.valid_moves_s[s]
-        cur_best = -float('inf')
-        best_act = -1
+        if node.game_ended != 0:
+            # terminal node
+            return -node.game_ended
 
         # pick the action with the highest upper confidence bound
-        for a in range(ai_environment.getActionSize()):
-            if valids[a]:
-                if (s, a) in self.Qsa:
-                    u = self.Qsa[(s, a)] + self.args.cpuct * self.policy_s[s][a] * math.sqrt(
-                            self.visit_number_s[s]) / (1 + self.visit_number_s_a[(s, a)])
-                else:
-                    u = self.args.cpuct * self.policy_s[s][a] * math.sqrt(self.visit_number_s[s] + EPS)     # Q = 0 ?
-
-                if u > cur_best:
-                    cur_best = u
-                    best_act = a
+        index = node.select(self.args.cpuct)
+        # the nodes on the path are kept in the table until the value is propagated
+        self.nodes.protect(s)
+        try:
+            value = self.search(self._child(node, index, canonicalBoard))
+        finally:
+            self.nodes.release(s)
+
+        node.update(index, value)
+        return -value
 
-        a = best_act
-        next_s, next_player = ai_environment.getNextState(canonicalBoard, 1, a)
+    def search_batch(self, canonicalBoard, batch_size):
+        """
+        Performs up to batch_size iterations of MCTS with a single evaluation of the neural network.
 
-        next_s = ai_environment.getCanonicalForm(next_s, next_player)
+        The paths are descended one after the other. Every edge on a path gets a virtual loss, so the next paths
+        tend to choose other edges. The leaves found are evaluated together, then the values are propagated up
+        the paths and the virtual losses are taken back.
 
-        value = self.search(next_s)
+        A path ending in a leaf which is already waiting for evaluation does not count as an iteration. Its
+        virtual loss is taken back, so the next path would be the same: the batch is evaluated at once instead.
 
-        if (s, a) in self.Qsa:
-            self.Qsa[(s, a)] = (self.visit_number_s_a[(s, a)] * self.Qsa[(s, a)] + value) / (
-                        self.visit_number_s_a[(s, a)] + 1)
-            self.visit_number_s_a[(s, a)] += 1
+        Returns:
+            simulations: the number of iterations backed up, at least 1
+        """
+        leaves = []     # (s, board, path) of the leaves to evaluate
+        pending = set()
+        protected = []  # keys of the nodes on the paths, kept in the table until the values are propagated
+        simulations = 0
+        collided = False
+        while simulations < batch_size and not collided:
+            path = []   # (node, index of the edge) pairs from the root
+            board = canonicalBoard
+            while True:
+                s = ai_environment.stringRepresentation(board)
+                node = self.nodes.get(s)
+                if node is None:
+                    if s in pending:
+                        self._backup(path, None)
+                        collided = True
+                        break
+                    game_ended = ai_environment.getGameEnded(board, 1)
+                    if game_ended != 0:
+                        # terminal node
+                        self.nodes.put(s, MCTSNode.terminal(game_ended))
+                        self._backup(path, -game_ended)
+                    else:
+                        pending.add(s)
+                        leaves.append((s, board, path))
+                    simulations += 1
+                    break
+                if node.game_ended != 0:
+                    # terminal node
+                    self._backup(path, -node.game_ended)
+                    simulations += 1
+                    break
+                index = node.select(self.args.cpuct)
+                node.add_virtual_loss(index)
+                path.append((node, index))
+                self.nodes.protect(s)
+                protected.append(s)
+                board = self._child(node, index, board)
+
+        try:
+            if leaves:
+                boards = np.stack([ai_environment.getEncodedBoard(board) for _s, board, _path in leaves])
+                policies, values = self.predictor.predict_batch(boards)
+                for (s, board, path), policy, value in zip(leaves, policies, values):
+                    self._expand(s, board, policy)
+                    self._backup(path, -value)
+        finally:
+            for s in protected:
+                self.nodes.release(s)
+        return simulations
+
+    @staticmethod
+    def _backup(path, value):
+        """
+        Takes back the virtual losses of the path and updates its edges with the value.
 
+        :param path: (node, index of the edge) pairs from the root
+        :param value: Value for the player to move at the last node of the path, as returned by
+                      :func:`search`. If None, only the virtual losses are taken back.
+        """
+        for node, index in reversed(path):
+            node.revert_virtual_loss(index)
+            if value is not None:
+                node.update(index, value)
+                value = -value
+
+    @staticmethod
+    def _child(node, index, canonicalBoard):
+        next_s, next_player = ai_environment.getNextState(canonicalBoard, 1, node.actions[index])
+        next_s = ai_environment.getCanonicalForm(next_s, next_player)
+        if node.children[index] is None:
+            node.children[index] = ai_environment.stringRepresentation(next_s)
+        return next_s
+
+    def _expand(self, s, canonicalBoard, policy):
+        actions = np.flatnonzero(ai_environment.getValidMoves(canonicalBoard, 1))
+        prior = np.asarray(policy, dtype=np.float64)[actions]      # masking invalid moves
+        sum_current_policy = np.sum(prior)
+        if sum_current_policy > 0:
+            prior /= sum_current_policy    # re-normalize
         else:
-            self.Qsa[(s, a)] = value
-            self.visit_number_s_a[(s, a)] = 1
+            # if all valid moves were masked make all valid moves equally probable
 
-        self.visit_number_s[s] += 1
-        return -value
+            # NB! All valid moves may be masked if either your NNet architecture is insufficient or you've get overfitting or something else.
+            # If you have got dozens or hundreds of these messages you should pay attention to your NNet and/or training process.
+            print("All valid moves were masked, do workaround.")
+            prior = np.full(len(actions), 1. / len(actions))
+
+        self.nodes.put(s, MCTSNode(actions, prior))
@@ -1,5 +1,7 @@
 import abc
 
+import numpy as np
+
 
 class NeuralNet(metaclass=abc.ABCMeta):
     """
@@ -28,6 +30,15 @@ class NeuralNet(metaclass=abc.ABCMeta):
         """
         pass
 
+    def train_from_buffer(self, replay_buffer):
+        """
+        Trains the network with all the examples of a ReplayBuffer. Override it
+        to read the examples batch by batch, this default loads all of them.
+        """
+        examples = replay_buffer.examples()
+        np.random.shuffle(examples)
+        self.train(examples)
+
     @abc.abstractmethod
     def predict(self, board):
         """
@@ -41,6 +52,22 @@ class NeuralNet(metaclass=abc.ABCMeta):
         """
         pass
 
+    def predict_batch(self, boards):
+        """
+        Evaluates several boards at once. Override it if the network can
+        evaluate a batch faster than the boards one by one.
+
+        Input:
+            boards: numpy array of boards in canonical form, stacked along the
+                    first axis.
+
+        Returns:
+            pis: numpy array of policy vectors, one row for each board
+            vs: numpy array of the values of the boards
+        """
+        pis, vs = zip(*[self.predict(board) for board in boards])
+        return np.array(pis), np.array(vs).reshape(len(boards))
+
     @abc.abstractmethod
     def save_checkpoint(self, folder, filename):
         """
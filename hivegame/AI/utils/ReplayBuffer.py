@@ -0,0 +1,165 @@
+import os
+import shutil
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+_CHUNK_PREFIX = 'chunk_'
+_TMP_SUFFIX = '.tmp'
+
+
+class _Chunk(object):
+    """
+    Examples of one iteration, memory-mapped from the files of its directory:
+
+    - boards.npy: int8 array of the boards
+    - pi_index.npy, pi_value.npy: the non-zero entries of all the policies (int16 action numbers and float16
+      probabilities), one after the other
+    - pi_offset.npy: the entries of the ith policy are at [pi_offset[i], pi_offset[i + 1])
+    - v.npy: float32 values
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.boards = np.load(os.path.join(path, 'boards.npy'), mmap_mode='r')
+        self.pi_index = np.load(os.path.join(path, 'pi_index.npy'), mmap_mode='r')
+        self.pi_value = np.load(os.path.join(path, 'pi_value.npy'), mmap_mode='r')
+        self.pi_offset = np.load(os.path.join(path, 'pi_offset.npy'))
+        self.v = np.load(os.path.join(path, 'v.npy'), mmap_mode='r')
+
+    def __len__(self):
+        return len(self.v)
+
+    @staticmethod
+    def write(path: str, examples: List[Tuple]) -> None:
+        boards = np.array([np.asarray(board, dtype=np.int8) for board, _pi, _v in examples], dtype=np.int8)
+        indices = [np.flatnonzero(np.asarray(pi)) for _board, pi, _v in examples]
+        values = [np.asarray(pi)[index] for (_board, pi, _v), index in zip(examples, indices)]
+        offsets = np.zeros(len(examples) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(index) for index in indices])
+        empty = np.zeros(0)
+        # A chunk appears only when it is complete
+        tmp_path = path + _TMP_SUFFIX
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, 'boards.npy'), boards)
+        np.save(os.path.join(tmp_path, 'pi_index.npy'), np.concatenate(indices or [empty]).astype(np.int16))
+        np.save(os.path.join(tmp_path, 'pi_value.npy'), np.concatenate(values or [empty]).astype(np.float16))
+        np.save(os.path.join(tmp_path, 'pi_offset.npy'), offsets)
+        np.save(os.path.join(tmp_path, 'v.npy'), np.array([v for _board, _pi, v in examples], dtype=np.float32))
+        os.rename(tmp_path, path)
+
+
+class ReplayBuffer(object):
+    """
+    On-disk buffer of the training examples of the latest iterations. Every iteration is appended as a new chunk
+    of .npy files, and the oldest chunks are deleted, so the cost of saving only depends on the new examples.
+    The chunks are memory-mapped, examples are read when they are sampled.
+    """
+
+    def __init__(self, folder: str, max_chunks: int, action_size: int):
+        """
+        :param folder: Directory of the chunks. Chunks found there are loaded.
+        :param max_chunks: Number of latest iterations to keep
+        :param action_size: Length of the policy vectors
+        """
+        self.folder = folder
+        self.max_chunks = max_chunks
+        self.action_size = action_size
+        os.makedirs(folder, exist_ok=True)
+        names = sorted(name for name in os.listdir(folder)
+                       if name.startswith(_CHUNK_PREFIX) and not name.endswith(_TMP_SUFFIX))
+        self._chunks = [_Chunk(os.path.join(folder, name)) for name in names]
+        self._next_id = int(names[-1][len(_CHUNK_PREFIX):]) + 1 if names else 0
+        self._update_offsets()
+
+    def _update_offsets(self) -> None:
+        # global index of the first example of each chunk, and the total count at the end
+        self._offsets = np.cumsum([0] + [len(chunk) for chunk in self._chunks])
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self._chunks)
+
+    def append(self, examples: Iterable[Tuple]) -> None:
+        """
+        Stores the examples of an iteration as a new chunk, and drops the oldest chunks above max_chunks.
+
+        :param examples: (board, pi, v) tuples
+        """
+        examples = list(examples)
+        path = self._new_chunk_path()
+        _Chunk.write(path, examples)
+        self._add_chunk(path)
+
+    def extend(self, other: 'ReplayBuffer') -> None:
+        """
+        Copies the chunks of another buffer after the chunks of this one, and drops the oldest chunks above
+        max_chunks.
+        """
+        for chunk in other._chunks:
+            path = self._new_chunk_path()
+            # A chunk appears only when it is complete
+            shutil.copytree(chunk.path, path + _TMP_SUFFIX)
+            os.rename(path + _TMP_SUFFIX, path)
+            self._add_chunk(path)
+
+    def clear(self) -> None:
+        """
+        Deletes every chunk of the buffer.
+        """
+        for chunk in self._chunks:
+            shutil.rmtree(chunk.path)
+        self._chunks = []
+        self._update_offsets()
+
+    def _new_chunk_path(self) -> str:
+        path = os.path.join(self.folder, '{}{:06d}'.format(_CHUNK_PREFIX, self._next_id))
+        self._next_id += 1
+        return path
+
+    def _add_chunk(self, path: str) -> None:
+        self._chunks.append(_Chunk(path))
+        while len(self._chunks) > self.max_chunks:
+            oldest = self._chunks.pop(0)
+            shutil.rmtree(oldest.path)
+        self._update_offsets()
+
+    def get(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        :param indices: Indices of examples, from 0 to len(self) - 1
+        :return: int8 boards, dense float32 policies and float32 values of the examples, in the order of indices
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        chunk_numbers = np.searchsorted(self._offsets, indices, side='right') - 1
+        board_shape = self._chunks[0].boards.shape[1:] if self._chunks else ()
+        boards = np.zeros((len(indices),) + board_shape, dtype=np.int8)
+        pis = np.zeros((len(indices), self.action_size), dtype=np.float32)
+        vs = np.zeros(len(indices), dtype=np.float32)
+        for chunk_number in np.unique(chunk_numbers):
+            chunk = self._chunks[chunk_number]
+            rows = np.flatnonzero(chunk_numbers == chunk_number)
+            local = indices[rows] - self._offsets[chunk_number]
+            boards[rows] = chunk.boards[local]
+            vs[rows] = chunk.v[local]
+            for row, i in zip(rows, local):
+                start, end = chunk.pi_offset[i], chunk.pi_offset[i + 1]
+                pis[row, chunk.pi_index[start:end]] = chunk.pi_value[start:end]
+        return boards, pis, vs
+
+    def epoch_batches(self, batch_size: int, rng=np.random) -> List[np.ndarray]:
+        """
+        :return: Indices of the mini-batches of one epoch over all the examples, in random order. The indices
+                 within a batch are sorted, so they are read in the order of the files.
+        """
+        order = rng.permutation(len(self))
+        return [np.sort(order[start:start + batch_size]) for start in range(0, len(order), batch_size)]
+
+    def examples(self) -> List[Tuple[np.ndarray, np.ndarray, float]]:
+        """
+        :return: All the examples as (board, pi, v) tuples, in the format of Coach.executeEpisode
+        """
+        boards, pis, vs = self.get(np.arange(len(self)))
+        return list(zip(boards, pis, vs.tolist()))
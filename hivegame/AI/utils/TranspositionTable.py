@@ -0,0 +1,135 @@
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+# Eviction policies
+LRU = 'lru'        # evict the least recently used nodes
+VISITS = 'visits'  # evict the nodes with the lowest visit count
+
+
+class TranspositionTable(object):
+    """
+    Nodes of the search tree, keyed by the string representation of the board (or the hash of the state).
+
+    The number of stored nodes can be limited. When the table is full, nodes are evicted according to the
+    eviction policy. An evicted node is simply expanded again by the search if it is reached later.
+
+    The limit is a node count, not a number of bytes. The nodes of :mod:`.MCTS` only keep arrays over the valid
+    actions and the keys of their children, so the memory used is about max_size times the size of a node, see
+    :func:`nbytes`.
+
+    The search protects the nodes it is using, i.e. the root and the nodes on the paths being descended, so they
+    are never evicted, see :func:`protect`.
+    """
+
+    def __init__(self, max_size=None, eviction=LRU):
+        """
+        :param max_size: Maximum number of nodes (not bytes), None means unlimited. At least 2, so that the root
+                         and a new node fit.
+        :param eviction: LRU or VISITS
+        """
+        assert eviction in (LRU, VISITS)
+        assert max_size is None or max_size >= 2, "The table should hold at least 2 nodes"
+        self.max_size = max_size
+        self.eviction = eviction
+        self._nodes = OrderedDict()
+        self._protected = Counter()     # key -> number of times it is protected
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, key):
+        return key in self._nodes
+
+    def __getitem__(self, key):
+        """
+        Looks up a node without updating the statistics or the order of the nodes.
+        """
+        return self._nodes[key]
+
+    def items(self):
+        return self._nodes.items()
+
+    def get(self, key):
+        """
+        :return: The node of the key, None if it is not stored
+        """
+        node = self._nodes.get(key)
+        if node is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.eviction == LRU:
+            self._nodes.move_to_end(key)
+        return node
+
+    def put(self, key, node) -> None:
+        self._nodes[key] = node
+        if self.max_size is not None and len(self._nodes) > self.max_size:
+            self._evict(key)
+
+    def protect(self, key) -> None:
+        """
+        Keeps the node of the key from being evicted until :func:`release` is called as many times.
+        """
+        self._protected[key] += 1
+
+    def release(self, key) -> None:
+        self._protected[key] -= 1
+        if not self._protected[key]:
+            del self._protected[key]
+
+    def retain(self, keys) -> None:
+        """
+        Removes every node except the ones of the given keys.
+        """
+        for key in [key for key in self._nodes if key not in keys]:
+            del self._nodes[key]
+
+    def _evict(self, new_key) -> None:
+        if self.eviction == LRU:
+            skipped = 0
+            while len(self._nodes) > self.max_size and skipped < len(self._nodes):
+                key, node = self._nodes.popitem(last=False)
+                if key == new_key or key in self._protected:
+                    # in use, so it counts as recently used
+                    self._nodes[key] = node
+                    skipped += 1
+                    continue
+                self.evictions += 1
+            return
+        # Scanning the visit counts is linear, so a tenth of the table is evicted at once. The new node has not
+        # been visited yet, it is kept anyway.
+        keys = [key for key in self._nodes if key != new_key and key not in self._protected]
+        count = min(len(keys), max(len(self._nodes) - self.max_size, self.max_size // 10))
+        if count == 0:
+            return
+        visits = np.array([self._nodes[key].visit_count for key in keys])
+        for i in np.argpartition(visits, count - 1)[:count]:
+            del self._nodes[keys[i]]
+        self.evictions += count
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def nbytes(self) -> int:
+        """
+        :return: Approximate memory used by the nodes, i.e. their arrays and the keys of their children
+        """
+        return sum(node.nbytes for node in self._nodes.values())
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._nodes),
+            'max_size': self.max_size,
+            'nbytes': self.nbytes(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'evictions': self.evictions,
+        }
@@ -12,6 +12,7 @@ from hivegame.engine.environment.aienvironment import ai_environment
 
 from .HiveNNet import HiveNNet as hivenet
 from keras.models import load_model
+from keras.utils import Sequence
 
 args = dotdict({
     'lr': 0.001,
@@ -20,8 +21,31 @@ args = dotdict({
     'batch_size': 64,
     'cuda': False,
     'num_channels': 16,
+    'prefetch': 4,      # batches prepared by a background thread while training from a replay buffer, 0 disables it
 })
 
+
+class ReplaySequence(Sequence):
+    """
+    Shuffled mini-batches of the examples of a ReplayBuffer. Only the batches being used are in memory.
+    """
+
+    def __init__(self, replay_buffer, batch_size):
+        self.replay_buffer = replay_buffer
+        self.batch_size = batch_size
+        self.on_epoch_end()
+
+    def __len__(self):
+        return len(self.batches)
+
+    def __getitem__(self, index):
+        boards, pis, vs = self.replay_buffer.get(self.batches[index])
+        return boards.astype(np.float32), [pis, vs]
+
+    def on_epoch_end(self):
+        self.batches = self.replay_buffer.epoch_batches(self.batch_size)
+
+
 class NNetWrapper(NeuralNet):
     def __init__(self):
         self.nnet = hivenet(args)
@@ -39,6 +63,16 @@ class NNetWrapper(NeuralNet):
         target_vs = np.asarray(target_vs)
         self.nnet.model.fit(x = input_boards, y = [target_pis, target_vs], batch_size = args.batch_size, epochs = args.epochs)
 
+    def train_from_buffer(self, replay_buffer):
+        """
+        Trains with the examples of a replay buffer, reading them batch by batch, so the memory used does not
+        grow with the size of the buffer.
+        """
+        sequence = ReplaySequence(replay_buffer, args.batch_size)
+        self.nnet.model.fit_generator(sequence, steps_per_epoch=len(sequence), epochs=args.epochs,
+                                      max_queue_size=max(args.prefetch, 1), workers=1 if args.prefetch else 0,
+                                      use_multiprocessing=False, shuffle=False)
+
     def predict(self, board):
         """
         board: np array with board
@@ -55,6 +89,13 @@ class NNetWrapper(NeuralNet):
         #print('PREDICTION TIME TAKEN : {0:03f}'.format(time.time()-start))
         return pi[0], v[0]
 
+    def predict_batch(self, boards):
+        """
+        boards: np array of boards stacked along the first axis
+        """
+        pi, v = self.nnet.model.predict(np.asarray(boards, dtype=np.float64))
+        return pi, v[:, 0]
+
     def save_checkpoint(self, folder='checkpoint', filename='checkpoint.pth.tar'):
         filepath = os.path.join(folder, filename)
         if not os.path.exists(folder):
@@ -1,6 +1,13 @@
 #! /usr/bin/env python
 
 import sys
+import itertools
+import math
+import multiprocessing
+import time
+from collections import namedtuple
+from typing import Callable, Dict, List, Tuple
+
 from hivegame.engine.environment.environment import Environment
 from hivegame.AI.random_player import RandomPlayer
 from hivegame.AI.human_player import HumanPlayer
@@ -14,6 +21,54 @@ if hasPyQt5:
 import logging
 
 
+class SPRT(object):
+    """
+    Sequential probability ratio test of the winning rate of a player. Only the decisive games are counted.
+
+    The hypotheses are H0: the player wins with probability p0, and H1: with probability p1 > p0. The test
+    accepts H1 with an error rate of at most alpha if H0 holds, and rejects it with an error rate of at most beta
+    if H1 holds, usually long before a fixed number of games would be played.
+    """
+    ACCEPT = 1
+    REJECT = -1
+    UNDECIDED = 0
+
+    def __init__(self, p0: float, p1: float, alpha: float = 0.05, beta: float = 0.05):
+        assert 0 < p0 < p1 < 1
+        self.p0 = p0
+        self.p1 = p1
+        self._lower = math.log(beta / (1 - alpha))
+        self._upper = math.log((1 - beta) / alpha)
+
+    @staticmethod
+    def around(threshold: float, delta: float, alpha: float = 0.05, beta: float = 0.05) -> 'SPRT':
+        """
+        :return: Test of a winning rate of threshold + delta against threshold - delta
+        """
+        return SPRT(max(threshold - delta, 0.01), min(threshold + delta, 0.99), alpha, beta)
+
+    def llr(self, wins: int, losses: int) -> float:
+        """
+        :return: Log-likelihood ratio of H1 against H0
+        """
+        return wins * math.log(self.p1 / self.p0) + losses * math.log((1 - self.p1) / (1 - self.p0))
+
+    def decide(self, wins: int, losses: int) -> int:
+        """
+        :return: ACCEPT, REJECT or UNDECIDED
+        """
+        llr = self.llr(wins, losses)
+        if llr >= self._upper:
+            return SPRT.ACCEPT
+        if llr <= self._lower:
+            return SPRT.REJECT
+        return SPRT.UNDECIDED
+
+
+# Outcome of one game of the ParallelArena. white and black are the names of the players, status is a GameStatus.
+GameResult = namedtuple("GameResult", "white black status seconds")
+
+
 class Arena(object):
 
     def __init__(self, player1, player2):
@@ -72,6 +127,37 @@ class Arena(object):
                 raise ValueError
         return whiteWon, blackWon, draws
 
+    def playGamesSequential(self, num: int, sprt: SPRT) -> Tuple[int, int, int, int]:
+        """
+        Plays at most num games, until the sequential test of the winning rate of player 2 is decided. The players
+        start the games alternately, beginning with player 1.
+
+        :return: The number of wins of player 1 and player 2, the number of draws, and the decision of the test
+        """
+        wins1 = wins2 = draws = 0
+        decision = SPRT.UNDECIDED
+        for game in range(num):
+            swapped = game % 2 == 1
+            if swapped:
+                self._player1, self._player2 = self._player2, self._player1
+            gameResult = self.playGame()
+            if swapped:
+                self._player1, self._player2 = self._player2, self._player1
+            if gameResult == GameStatus.DRAW:
+                draws += 1
+            elif gameResult in (GameStatus.WHITE_WIN, GameStatus.BLACK_WIN):
+                if (gameResult == GameStatus.WHITE_WIN) != swapped:
+                    wins1 += 1
+                else:
+                    wins2 += 1
+            else:
+                logging.error("Invalid response from environment: {}".format(gameResult))
+                raise ValueError
+            decision = sprt.decide(wins2, wins1)
+            if decision != SPRT.UNDECIDED:
+                break
+        return wins1, wins2, draws, decision
+
     def playGames(self, num: int):
         """
         Play a number of games. Half of the game start with player 1 to begin, and player 2 starts the game
@@ -94,6 +180,129 @@ class Arena(object):
         self._player1, self._player2 = self._player2, self._player1
         return white_won + white_won2, black_won + black_won2, draw + draw2
 
+# Players of the current ParallelArena worker process by name, created on first use
+_worker_factories = {}
+_worker_players = {}
+
+
+def _initArenaWorker(factories):
+    _worker_factories.clear()
+    _worker_factories.update(factories)
+    _worker_players.clear()
+
+
+def _playArenaGame(white_name, black_name) -> GameResult:
+    for name in (white_name, black_name):
+        if name not in _worker_players:
+            _worker_players[name] = _worker_factories[name]()
+    start = time.time()
+    status = Arena(_worker_players[white_name], _worker_players[black_name]).playGame()
+    return GameResult(white_name, black_name, status, time.time() - start)
+
+
+class ParallelArena(object):
+    """
+    Plays games among several players on a pool of processes.
+
+    The players are given by picklable factories, e.g. classes or functools.partial objects loading a checkpoint,
+    since the players themselves (and their networks) can not be sent to other processes. Every worker process
+    creates each player once, and reuses it in the following games.
+    """
+
+    def __init__(self, factories: Dict[str, Callable[[], 'Player']], processes: int = None):
+        """
+        :param factories: Functions creating the players, by the name of the player
+        :param processes: Number of worker processes, the number of CPUs by default
+        """
+        self._factories = factories
+        self._processes = processes
+        self.results: List[GameResult] = []
+
+    def _pool(self):
+        # Forking a process with an initialized Keras session is not safe
+        context = multiprocessing.get_context('spawn')
+        return context.Pool(self._processes, initializer=_initArenaWorker, initargs=(self._factories,))
+
+    def _play(self, pool, pairings: List[Tuple[str, str]]) -> List[GameResult]:
+        results = pool.starmap(_playArenaGame, pairings)
+        for result in results:
+            if result.status not in (GameStatus.WHITE_WIN, GameStatus.BLACK_WIN, GameStatus.DRAW):
+                logging.error("Invalid response from environment: {}".format(result.status))
+                raise ValueError
+        self.results += results
+        logging.info("Played {} games in {:.1f}s of game time".format(len(results), sum(r.seconds for r in results)))
+        return results
+
+    @staticmethod
+    def _pairings(name1: str, name2: str, num: int) -> List[Tuple[str, str]]:
+        # Half of the games start with the first player, as in Arena.playGames. If num is odd, the first player
+        # starts one more game.
+        return [(name1, name2)] * ((num + 1) // 2) + [(name2, name1)] * (num // 2)
+
+    @staticmethod
+    def _score(results: List[GameResult], name1: str, name2: str) -> Tuple[int, int, int]:
+        """
+        :return: The number of wins of the two players, and the number of draws among the results
+        """
+        wins = {name1: 0, name2: 0}
+        draws = 0
+        for result in results:
+            if result.status == GameStatus.WHITE_WIN:
+                wins[result.white] += 1
+            elif result.status == GameStatus.BLACK_WIN:
+                wins[result.black] += 1
+            else:
+                draws += 1
+        return wins[name1], wins[name2], draws
+
+    def playGames(self, name1: str, name2: str, num: int) -> Tuple[int, int, int]:
+        """
+        Plays num games between two players, half of them started by each player. If num is odd, the first
+        player starts one more game.
+
+        :return: The number of wins of the two players, and the number of draws
+        """
+        with self._pool() as pool:
+            results = self._play(pool, self._pairings(name1, name2, num))
+        return self._score(results, name1, name2)
+
+    def playGamesSequential(self, name1: str, name2: str, num: int, sprt: SPRT) -> Tuple[int, int, int, int]:
+        """
+        Plays at most num games between two players in rounds, until the sequential test of the winning rate of
+        the second player is decided. Every round has the same number of games started by each player, and
+        keeps all the processes busy. The last round is cut to the games left, so at most num games are played.
+
+        :return: The number of wins of the two players, the number of draws, and the decision of the test
+        """
+        round_size = 2 * (self._processes or multiprocessing.cpu_count())
+        results = []
+        decision = SPRT.UNDECIDED
+        with self._pool() as pool:
+            while len(results) < num and decision == SPRT.UNDECIDED:
+                games = min(round_size, num - len(results))
+                results += self._play(pool, self._pairings(name1, name2, games))
+                wins1, wins2, _draws = self._score(results, name1, name2)
+                decision = sprt.decide(wins2, wins1)
+        return self._score(results, name1, name2) + (decision,)
+
+    def tournament(self, num: int) -> Dict[Tuple[str, str], Tuple[int, int, int]]:
+        """
+        Round-robin tournament: every pair of players plays num games, half of them started by each player.
+        All the games are distributed over the pool at once.
+
+        :return: (wins of the first player, wins of the second player, draws) for every pair of names
+        """
+        pairs = list(itertools.combinations(sorted(self._factories), 2))
+        with self._pool() as pool:
+            results = self._play(pool, [pairing for name1, name2 in pairs
+                                        for pairing in self._pairings(name1, name2, num)])
+        table = {}
+        for name1, name2 in pairs:
+            pair_results = [r for r in results if {r.white, r.black} == {name1, name2}]
+            table[(name1, name2)] = self._score(pair_results, name1, name2)
+        return table
+
+
 headless = False
 
 def main():
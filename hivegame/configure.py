@@ -3,12 +3,24 @@ from hivegame.engine.hive_utils import dotdict
 train_args = dotdict({
     'numIters': 10,
     'numEps': 7,
+    'numSelfPlayWorkers': 1,    # processes playing the episodes of an iteration in parallel
+    'inferenceServer': False,   # evaluate the boards of the workers in batches with one network
+    'inferenceBatchSize': 32,
+    'inferenceMaxWait': 0.005,  # seconds
     'tempThreshold': 15,
     'updateThreshold': 0.5,
     'maxlenOfQueue': 200000,
     'numMCTSSims': 5,
     'arenaCompare': 40,
+    'arenaWorkers': 1,  # processes playing the arena games in parallel
+    'arenaSPRT': False,     # stop the arena games when the sequential test is decided
+    'sprtDelta': 0.1,       # the test is between updateThreshold - sprtDelta and updateThreshold + sprtDelta
+    'sprtAlpha': 0.05,
+    'sprtBeta': 0.05,
     'cpuct': 0.8,
+    'mctsBatchSize': 4,     # leaves evaluated together by the neural network, at most numMCTSSims
+    'mctsTableSize': 200000,    # maximum number of search tree nodes kept in memory (a count, not bytes)
+    'mctsEviction': 'lru',      # which nodes are dropped when the table is full: 'lru' or 'visits'
 
     'checkpoint': './temp/',
     'load_model': False,
@@ -0,0 +1,115 @@
+import logging
+from typing import Dict, List, Tuple, Any
+
+import numpy as np
+
+from engine.hive_utils import Player, HiveException
+import hivegame.pieces.piece_factory as piece_fact
+from hivegame.pieces.piece import HivePiece
+
+# Static tables of the fixed size action space. The layout is explained at
+# :func:`.hive_representation.get_all_action_vector`. It only depends on the sorted piece list, which is the same
+# for both players apart from the color, so the numeric tables are shared and only the piece objects are per player.
+
+# Action types
+INIT = 0
+PLACE = 1
+MOVE = 2
+
+_TYPE_NAMES = ('init', 'place', 'move')
+_DIRECTION_COUNT = 6
+
+_PIECES: Dict[Player, List[HivePiece]] = {player: piece_fact.sorted_piece_list(player)
+                                          for player in (Player.WHITE, Player.BLACK)}
+_PIECE_IDS: Dict[HivePiece, int] = {p: i for pieces in _PIECES.values() for i, p in enumerate(pieces)}
+PIECE_COUNT = len(_PIECES[Player.WHITE])
+
+
+def _build_table() -> np.ndarray:
+    """
+    :return: Array of shape (action count, 4). A row is (type, piece id, adjacent piece id, value), where value
+             is the direction of placement or the index of the target cell of a movement. Unused fields are -1.
+    """
+    pieces = _PIECES[Player.WHITE]
+    rows = []
+    # initial placement, the queen can not be placed in the first turn
+    for piece_id, piece in enumerate(pieces):
+        if piece.kind != 'Q':
+            rows.append((INIT, piece_id, -1, -1))
+    # placement next to another piece
+    for piece_id in range(PIECE_COUNT):
+        for adj_piece_id in range(PIECE_COUNT):
+            if adj_piece_id == piece_id:
+                continue
+            for direction in range(1, _DIRECTION_COUNT + 1):  # starting from west, clockwise
+                rows.append((PLACE, piece_id, adj_piece_id, direction))
+    # movement
+    for piece_id, piece in enumerate(pieces):
+        for inner_index in range(piece.move_vector_size):
+            rows.append((MOVE, piece_id, -1, inner_index))
+    return np.array(rows, dtype=np.int16)
+
+
+ACTION_TABLE = _build_table()
+ACTION_SIZE = len(ACTION_TABLE)
+
+# Inverse of ACTION_TABLE
+_ENCODE_TABLE: Dict[Tuple[int, int, int, int], int] = {tuple(row): i for i, row in enumerate(ACTION_TABLE.tolist())}
+
+
+def _build_decoded(player: Player) -> List[Tuple[str, Any]]:
+    pieces = _PIECES[player]
+    result = []
+    for atype, piece_id, adj_piece_id, value in ACTION_TABLE.tolist():
+        if atype == INIT:
+            result.append(('init', pieces[piece_id]))
+        elif atype == PLACE:
+            result.append(('place', (pieces[piece_id], pieces[adj_piece_id], value)))
+        else:
+            result.append(('move', (pieces[piece_id], value)))
+    return result
+
+
+_DECODED: Dict[Player, List[Tuple[str, Any]]] = {player: _build_decoded(player) for player in _PIECES}
+
+
+def sorted_pieces(player: Player) -> List[HivePiece]:
+    """
+    Same as :func:`hivegame.pieces.piece_factory.sorted_piece_list`, without building the list again.
+
+    :return: The pieces of the player, indexed by piece id. The list is shared, so it must not be modified.
+    """
+    return _PIECES[player]
+
+
+def decode_action(action_number: int, player: Player) -> Tuple[str, Any]:
+    """
+    :param action_number: Index of the action in the fixed size action space
+    :param player: The player to move
+    :return: One of ('init', piece), ('place', (piece, adjacent piece, direction)) or
+             ('move', (piece, index of the target cell))
+    """
+    if not 0 <= action_number < ACTION_SIZE:
+        # Index overflow
+        error_msg = "Invalid action number, out of bounds"
+        logging.error(error_msg)
+        raise HiveException(error_msg, 10010)
+    return _DECODED[player][action_number]
+
+
+def encode_action(atype: str, piece: HivePiece, adj_piece: HivePiece = None, value: int = -1) -> int:
+    """
+    Inverse of :func:`decode_action`.
+
+    :param atype: 'init', 'place' or 'move'
+    :param piece: The piece to place or to move
+    :param adj_piece: The piece next to which the piece is placed. Only used at placement.
+    :param value: Direction of the placement, or the index of the target cell of a movement
+    :return: Index of the action in the fixed size action space
+    """
+    adj_piece_id = _PIECE_IDS[adj_piece] if adj_piece is not None else -1
+    key = (_TYPE_NAMES.index(atype), _PIECE_IDS[piece], adj_piece_id, value)
+    try:
+        return _ENCODE_TABLE[key]
+    except KeyError:
+        raise HiveException("Action is not part of the action space", 10010)
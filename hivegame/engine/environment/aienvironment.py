@@ -7,14 +7,80 @@ from engine.hive_utils import GameStatus, Player
 from engine.environment.AIGameEnv import AIGameEnv
 
 import logging
+import numpy as np
 import engine.hive_representation as represent
+import engine.action_space as action_space
+import engine.symmetry as symmetry
+import engine.move_generator as move_generator
 from hivegame.utils import importexport
 
+class HiveState(object):
+    """
+    A game state which can be passed to the methods of :class:`AIEnvironment` instead of the two dimensional
+    representation. It keeps the real game and caches everything derived from it, so that the adjacency matrix is
+    never decoded back into a game. The matrix is only computed as the input of the neural network.
+
+    Like the canonical board, a state is seen from the point of view of the player to move: player 1 is the
+    player to move, -1 is the opponent.
+    """
+
+    def __init__(self, hive: Hive):
+        self.hive = hive
+        self._board = None
+        self._valid_moves = None
+        self._game_ended = None
+
+    @property
+    def key(self):
+        """
+        :return: Hashable key of the state
+        """
+        return self.hive.level.canonical_hash
+
+    @property
+    def board(self) -> np.ndarray:
+        """
+        :return: The canonical two dimensional representation of the state
+        """
+        if self._board is None:
+            self._board = represent.canonical_adjacency_matrix(self.hive)
+        return self._board
+
+    @property
+    def valid_moves(self) -> np.ndarray:
+        """
+        :return: Read-only mask of the valid actions. It is updated from the mask of the state two actions earlier.
+        """
+        if self._valid_moves is None:
+            self._valid_moves = move_generator.action_vector(self.hive)
+        return self._valid_moves
+
+    @property
+    def game_ended(self) -> int:
+        """
+        :return: 0 if the game is not ended, 1 if the player to move won, -1 if lost.
+        """
+        if self._game_ended is None:
+            self._game_ended = AIEnvironment.game_ended_of_hive(self.hive, self.hive.current_player)
+        return self._game_ended
+
+    def next_state(self, action_number: int) -> 'HiveState':
+        """
+        :return: The state after performing the action. This state remains unchanged.
+        """
+        hive = self.hive.copy()
+        AIEnvironment.perform_action(hive, action_number)
+        return HiveState(hive)
+
+
 class AIEnvironment(AIGameEnv):
     """
     Environment controls the game. It contains all the methods to
     create a game, move or put down pieces, ask information about
     current state etc. This interface is stateless.
+
+    Boards are either two dimensional representations, or :class:`HiveState` objects. The latter avoids building
+    the game from the representation on every call.
     """
 
     @staticmethod
@@ -30,20 +96,40 @@ class AIEnvironment(AIGameEnv):
 # Methods for Game.py interface
     @staticmethod
     def stringRepresentation(board):
-        return represent.string_representation(board)
+        """
+        :param board: Either a two dimensional representation of the state or a Hive object
+        :return: Hashable key of the state. For Hive objects it is the canonical Zobrist hash, which does not need
+                 the board to be encoded.
+        """
+        if isinstance(board, HiveState):
+            return board.key
+        if isinstance(board, (np.ndarray, list)):
+            return represent.string_representation(board)
+        return board.level.canonical_hash
+
+    @staticmethod
+    def getEncodedBoard(board) -> np.ndarray:
+        """
+        :return: The two dimensional representation of the board, e.g. as input of the neural network
+        """
+        if isinstance(board, HiveState):
+            return board.board
+        return board
 
     @staticmethod
     def getActionSize():
         """
-        :return: Number of possible actions in the given state
+        :return: Size of the fixed size action space
         """
-        hive = Hive()
-        return len(represent.get_all_action_vector(hive))
+        return action_space.ACTION_SIZE
 
     @staticmethod
     def getCanonicalForm(two_dim_repr: List[List[int]], player_num):
+        if isinstance(two_dim_repr, HiveState):
+            # states are always seen from the player to move
+            return two_dim_repr
         hive = represent.load_state_with_player(two_dim_repr, AIEnvironment._player_to_inner_player(player_num))
-        return represent.two_dim_representation(represent.canonical_adjacency_state(hive))
+        return represent.canonical_adjacency_matrix(hive)
 
     @staticmethod
     def getGameEnded(board, player):
@@ -52,8 +138,17 @@ class AIEnvironment(AIGameEnv):
 
     @staticmethod
     def getGameEnded_simpified(board, player):
+        if isinstance(board, HiveState):
+            return board.game_ended * player
         inner_player = AIEnvironment._player_to_inner_player(player)
         hive = represent.load_state_with_player(board, inner_player)
+        return AIEnvironment.game_ended_of_hive(hive, inner_player)
+
+    @staticmethod
+    def game_ended_of_hive(hive: Hive, inner_player) -> int:
+        """
+        :return: 0 if the game is not ended, 1 if the given player won, -1 if lost
+        """
         res = 0
         white_queen_pos = hive.locate("wQ1")
         if white_queen_pos:
@@ -80,13 +175,25 @@ class AIEnvironment(AIGameEnv):
 
     @staticmethod
     def getValidMoves(board, player_num) -> List[int]:
+        if isinstance(board, HiveState):
+            return board.valid_moves
         hive = represent.load_state_with_player(board, AIEnvironment._player_to_inner_player(player_num))
         return represent.get_all_action_vector(hive)
 
     @staticmethod
     def getNextState(board, player, action_number):
         assert action_number >= 0
+        if isinstance(board, HiveState):
+            return board.next_state(action_number), player*(-1)
         hive = represent.load_state_with_player(board, AIEnvironment._player_to_inner_player(player))
+        AIEnvironment.perform_action(hive, action_number)
+        return represent.adjacency_matrix(hive), player*(-1)
+
+    @staticmethod
+    def perform_action(hive: Hive, action_number: int) -> None:
+        """
+        Performs the action given by its index in the fixed size action space.
+        """
         try:
             (piece, to_cell) = hive.action_from_vector(action_number)
         except HiveException as error:
@@ -103,40 +210,32 @@ class AIEnvironment(AIGameEnv):
             logging.error("Hive:\n{}".format(hive))
             importexport.export_hive(hive, importexport.saved_game_path("last_error.json"))
             raise
-        return represent.two_dim_representation(represent.get_adjacency_state(hive)), player*(-1)
 
     @staticmethod
     def getInitBoard():
         hive = Hive()
-        return represent.two_dim_representation(represent.get_adjacency_state(hive))
+        return represent.adjacency_matrix(hive)
 
     @staticmethod
-    def getSymmetries(board: List[List[int]], pi):
-        symmetries = []
-        # Rotate the board 5 times
-        for i in range(5):
-            symmetries.append(AIEnvironment._rotate_adjacency(board))
-        return [(sim, pi) for sim in symmetries]
+    def getInitState() -> HiveState:
+        return HiveState(Hive())
 
     @staticmethod
-    def _rotate_adjacency(two_dim_adjacency: List[List[int]]) -> List[List[int]]:
-        result = []
-        for row in two_dim_adjacency:
-            new_row = []
-            for direction in row:
-                if 0 < direction <= 5:
-                    new_row.append(direction + 1)
-                elif direction == 6:
-                    new_row.append(1)  # overflow of directions
-                else:
-                    new_row.append(direction)
-            result.append(new_row)
-        return result
+    def getSymmetries(board, pi):
+        """
+        :param board: Canonical board or HiveState
+        :return: The (board, pi) pairs of the 12 rotations and reflections of the board, including itself. The
+                 boards are encoded for the neural network. See :mod:`.symmetry`.
+        """
+        # the order of the ant and spider moves depends on the position
+        hive = board.hive if isinstance(board, HiveState) else represent.load_state_with_player(board, Player.WHITE)
+        boards = symmetry.symmetric_boards(AIEnvironment.getEncodedBoard(board))
+        return list(zip(boards, symmetry.symmetric_policies(pi, hive)))
 
     @staticmethod
     def getBoardSize():
         hive = Hive()
-        return represent.two_dim_representation(represent.canonical_adjacency_state(hive)).shape
+        return represent.canonical_adjacency_matrix(hive).shape
 
 
 ai_environment = AIEnvironment()
\ No newline at end of file
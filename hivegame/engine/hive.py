@@ -9,11 +9,17 @@ from engine.hive_utils import Player, HiveException, Direction
 from hivegame.utils.ascii_view import HiveView
 
 import engine.hive_validation as valid
+import engine.action_space as action_space
 import hivegame.pieces.piece_factory as piece_fact
 
 import logging
 
-from typing import List, Tuple, Any
+from collections import namedtuple
+from typing import List
+
+
+# Information needed to take back an action. See :func:`Hive.make_action`.
+UndoToken = namedtuple("UndoToken", "piece from_cell to_cell player")
 
 
 class Hive(object):
@@ -31,6 +37,14 @@ class Hive(object):
         """
         self.level = GameState()
 
+    def copy(self) -> 'Hive':
+        """
+        :return: A copy of the game which can be modified independently
+        """
+        result = self.__class__()
+        result.level = self.level.copy()
+        return result
+
     @property
     def current_player(self) -> Player:
         """
@@ -64,12 +78,34 @@ class Hive(object):
         If the place is already on board it means a movement. Otherwise it
         means a piece placement.
         """
-        pos = self.locate(piece)
+        self.make_action(piece, target_cell)
+
+    def make_action(self, piece: HivePiece, target_cell: hexutil.Hex) -> UndoToken:
+        """
+        Performs an action the same way as :func:`action_piece_to` does, and returns a token
+        which can be used to take the action back with :func:`unmake_action`. Tree search algorithms
+        can walk the game tree in place this way instead of copying the whole state for every node.
+        :return: Undo token of the action
+        """
+        pos = self.level.find_piece_position(piece)
+        player = self.level.current_player
         if not pos:
             self._place_piece_to(piece, target_cell)
         else:
             self._move_piece_to(piece, pos, target_cell)
-        self.level.current_player = self._toggle_player(self.level.current_player)
+        self.level.current_player = self._toggle_player(player)
+        return UndoToken(piece, pos, target_cell, player)
+
+    def unmake_action(self, token: UndoToken) -> None:
+        """
+        Takes back the action described by the token. Actions have to be taken back in reverse order.
+        :param token: The token returned by :func:`make_action`
+        """
+        if token.from_cell is None:
+            self.level.remove_from(token.piece, token.to_cell)
+        else:
+            self.level.move_to(token.piece, token.to_cell, token.from_cell)
+        self.level.current_player = token.player
 
     def validate_action(self, piece: HivePiece, target_cell: hexutil.Hex) -> bool:
         pos = self.locate(piece)
@@ -185,56 +221,7 @@ class Hive(object):
         :param cell: The hexagon the queen is currently at.
         :return: A list of hexagons where the queen can possibly go
         """
-        available_hexes = []
-        surroundings = cell.neighbours()
-        for nb in surroundings:
-            if not self.level.is_cell_free(nb):
-                continue
-            # does it have an adjacent free and an adjacent occupied cell that
-            # is also adjacent to the starting cell
-            mutual_nbs = list(GameState.get_mutual_neighbors(cell, nb))
-            assert len(mutual_nbs) == 2  # there are always two of them
-            if self.level.is_cell_free(mutual_nbs[0]) != self.level.is_cell_free(mutual_nbs[1]):
-                available_hexes.append(nb)
-
-        return available_hexes
-
-    @staticmethod
-    def _decode_action_number(action_number: int, player: Player) -> Tuple[str, Any]:
-        # initial
-        pieces = piece_fact.sorted_piece_list(player)
-        pc = len(pieces)
-        if action_number < pc - 1:
-            pieces = [p for p in pieces if p.kind != 'Q']
-            return 'init', pieces[action_number]
-        action_number -= pc - 1
-
-        # piece placement
-        place_bound = pc * (pc - 1) * 6
-        if action_number < place_bound:
-            one_bug_bound = (pc - 1) * 6
-            action_type = action_number % one_bug_bound
-            piece_number = action_number // one_bug_bound
-            adj_piece_number = action_type // 6
-            direction = (action_type % 6) + 1 # starting from west, clockwise
-            piece = pieces[piece_number]
-            adj_piece = [p for p in pieces if p != piece][adj_piece_number]
-            return 'place', (piece, adj_piece, direction)
-        action_number -= place_bound
-
-        # movement
-        for piece in pieces:
-            assert action_number >= 0
-            # Find piece
-            if action_number - piece.move_vector_size >= 0:
-                action_number -= piece.move_vector_size
-                continue
-            return 'move', (piece, action_number)
-
-        # Index overflow
-        error_msg = "Invalid action number, out of bounds"
-        logging.error(error_msg)
-        raise HiveException(error_msg, 10010)
+        return self.level.slide_moves(cell)
 
     def action_from_vector(self, action_number: int) -> (HivePiece, hexutil.Hex):
         """
@@ -245,7 +232,7 @@ class Hive(object):
         is executed. end_cell is the target location of the action.
         """
         assert action_number >= 0
-        atype, decoded = Hive._decode_action_number(action_number, self.level.current_player)
+        atype, decoded = action_space.decode_action(action_number, self.level.current_player)
         if atype == 'init':
             # That's an initial movement
             if len(self.level.get_played_pieces()) >= 2:
@@ -1,5 +1,3 @@
-from functools import reduce
-
 from engine.hive_utils import Direction, Player, get_queen_name, GameStatus
 import engine.hive_validation as valid
 import hivegame.pieces.piece_factory as piece_fact
@@ -155,9 +153,8 @@ def string_representation(two_dim_repr: np.ndarray):
     :return:  Hashable string representation of the current state
     """
     # We need to use comma as separator, because turn number can consist of more digits.
-    # Use reduce instead of string's join, because we want to avoid other than left recursion
-    return reduce(lambda i,j: i+j, reduce(lambda x,y: str(x)+str(y), two_dim_repr, ","), ",")
-    #return ",".join(str(x) for x in (y for y in two_dim_repr))
+    # Same output as folding the rows with string concatenation, but in linear time.
+    return ",," + "".join(str(row) for row in two_dim_repr)
 
 
 def _toggle_color(piece_name):
@@ -167,6 +164,68 @@ def _toggle_color(piece_name):
     return "".join(s)
 
 
+# Rows of the adjacency matrix, i.e. all the pieces sorted by name
+_MATRIX_PIECES = sorted(piece_fact.piece_set(Player.WHITE) | piece_fact.piece_set(Player.BLACK), key=str)
+_MATRIX_INDEX = {piece: i for i, piece in enumerate(_MATRIX_PIECES)}
+_MATRIX_SIZE = len(_MATRIX_PIECES)
+# The adjacency with itself is not stored
+_OFF_DIAGONAL = ~np.eye(_MATRIX_SIZE, dtype=bool)
+# Row of the same piece with the opposite color
+_COLOR_FLIP = np.array([_MATRIX_INDEX[piece_fact.name_to_piece(_toggle_color(str(p)))] for p in _MATRIX_PIECES])
+
+# Direction of a neighbour indexed by [dx + 2, dy + 1]. Other offsets in this range are not valid hexagon offsets.
+_OFFSET_DIRECTIONS = np.zeros((5, 3), dtype=np.int8)
+for _direction, (_dx, _dy) in enumerate(hexutil.Hex._neighbours, start=Direction.HX_W):
+    _OFFSET_DIRECTIONS[_dx + 2, _dy + 1] = _direction
+
+
+def _full_adjacency_matrix(hive: 'Hive') -> np.ndarray:
+    """
+    :return: Adjacency matrix including the diagonal, i.e. of shape (piece_count, piece_count).
+    """
+    coords = np.zeros((_MATRIX_SIZE, 3), dtype=np.int32)  # x, y, height in stack
+    placed = np.zeros(_MATRIX_SIZE, dtype=bool)
+    for cell, stack in hive.level.tiles.items():
+        for height, piece in enumerate(stack):
+            index = _MATRIX_INDEX[piece]
+            placed[index] = True
+            coords[index] = (cell.x, cell.y, height)
+    x, y, height = coords.T
+    # offset of the column piece from the row piece
+    dx = x[np.newaxis, :] - x[:, np.newaxis]
+    dy = y[np.newaxis, :] - y[:, np.newaxis]
+
+    result = np.zeros((_MATRIX_SIZE, _MATRIX_SIZE), dtype=np.int8)
+    result[placed] = 9
+    near = placed[:, np.newaxis] & placed[np.newaxis, :] & (np.abs(dx) <= 2) & (np.abs(dy) <= 1)
+    result[near] = _OFFSET_DIRECTIONS[dx[near] + 2, dy[near] + 1]
+    same_cell = near & (dx == 0) & (dy == 0)
+    stacked = np.where(height[np.newaxis, :] < height[:, np.newaxis], Direction.HX_LOW, Direction.HX_UP)
+    result[same_cell] = stacked[same_cell]
+    return result
+
+
+def adjacency_matrix(hive: 'Hive') -> np.ndarray:
+    """
+    Computes the same matrix as ``two_dim_representation(get_adjacency_state(hive))`` directly from the positions
+    of the pieces.
+
+    :return: Two dimensional int8 array. Rows are the pieces sorted by name, columns are the other pieces.
+    """
+    return _full_adjacency_matrix(hive)[_OFF_DIAGONAL].reshape(_MATRIX_SIZE, _MATRIX_SIZE - 1)
+
+
+def canonical_adjacency_matrix(hive: 'Hive') -> np.ndarray:
+    """
+    Computes the same matrix as ``two_dim_representation(canonical_adjacency_state(hive))``. The colors are
+    switched by permuting the rows and columns if it is black's turn.
+    """
+    matrix = _full_adjacency_matrix(hive)
+    if hive.current_player != Player.WHITE:
+        matrix = matrix[_COLOR_FLIP][:, _COLOR_FLIP]
+    return matrix[_OFF_DIAGONAL].reshape(_MATRIX_SIZE, _MATRIX_SIZE - 1)
+
+
 def get_all_action_vector(hive: 'Hive') -> List[int]:
     """
     The format of the fix-size action space is the following:
@@ -208,6 +267,7 @@ def get_all_action_vector(hive: 'Hive') -> List[int]:
         result += [0] * (len(piece_list) - 1)
 
         # Placing pieces
+        placement_cells = hive.level.placement_cells(hive.current_player)
         for p in piece_list:
             # Cannot place piece if:
             #   - it is already placed or
@@ -226,17 +286,8 @@ def get_all_action_vector(hive: 'Hive') -> List[int]:
                         # neighbor candidate not placed yet
                         result += [0] * direction_count
                         continue
-                    # get all boundary free cells
-                    surroundings = adj_pos.neighbours()
-                    for sur in surroundings:
-                        if hive.level.get_tile_content(sur):
-                            result.append(0)  # it is already occupied
-                        # cannot place if it is adjacent with the opponent
-                        elif any(hive.level.get_tile_content(nb_of_nb)[-1].color !=
-                                     hive.level.current_player for nb_of_nb in hive.level.occupied_surroundings(sur)):
-                            result.append(0)
-                        else:
-                            result.append(1)  # it can be placed
+                    # free cells which are not adjacent with the opponent
+                    result += [1 if sur in placement_cells else 0 for sur in adj_pos.neighbours()]
     assert len(result) == piece_count - 1 + piece_count * (possible_neighbor_count * direction_count)
 
     # moving pieces
@@ -329,8 +380,6 @@ def get_all_possible_actions(hive: 'Hive') -> Set[Tuple[HivePiece, hexutil.Hex]]
 
     # pieces which can be put down from hand
     pieces_to_put_down = set()
-    # cells where the player can put an unplayed piece to
-    available_cells = set()
 
     queen_piece = hive.get_piece_by_name(get_queen_name(hive.current_player))
     if len(my_pieces) == 3 and not queen_pos:
@@ -338,18 +387,8 @@ def get_all_possible_actions(hive: 'Hive') -> Set[Tuple[HivePiece, hexutil.Hex]]
     else:
         pieces_to_put_down.update(hive.level.get_unplayed_pieces(hive.current_player))
 
-    # get all boundary free cells
-    for p in my_pieces:
-        p_pos = hive.level.find_piece_position(p)
-        nbs = p_pos.neighbours()
-        available_cells.update({sur for sur in nbs if not hive.level.get_tile_content(sur)})
-    # Keep only those which have no opposite side neighbors
-    cells_to_remove = set()
-    for cell in available_cells:
-        nbs = hive.level.occupied_surroundings(cell)
-        if any(hive.level.get_tile_content(sur)[-1].color != hive.current_player for sur in nbs):
-            cells_to_remove.add(cell)
-    available_cells.difference_update(cells_to_remove)
+    # cells where the player can put an unplayed piece to: free cells touching the player and not the opponent
+    available_cells = hive.level.placement_cells(hive.current_player)
 
     # You can place all of your remaining pieces there
     for piece in pieces_to_put_down:
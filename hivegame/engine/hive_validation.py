@@ -1,5 +1,5 @@
 from __future__ import annotations
-from engine.hive_utils import get_queen_name
+from engine.hive_utils import get_queen_name, Player
 from hivegame.pieces.bee_piece import BeePiece
 import logging
 
@@ -112,8 +112,8 @@ def validate_place_piece(hive: 'Hive', piece: 'HivePiece', target_cell: hexutil.
     if len(hive.level.get_played_pieces()) < 2:
         return True
 
-    nbs = hive.level.occupied_surroundings(target_cell)
-    if any(piece.color !=  hive.level.get_tile_content(nb)[-1].color for nb in nbs):
+    opponent = Player.BLACK if piece.color == Player.WHITE else Player.WHITE
+    if hive.level.touch_count(opponent, target_cell):
         logging.info("validate_place_piece: Invalid placement")
         return False
 
@@ -143,26 +143,5 @@ def validate_one_hive(hive: 'Hive', pos: hexutil.Hex, piece: 'HivePiece'):
         logging.error("One hive rule called on empty tile")
         return True
 
-    # temporary remove piece
-    del hive.level.tiles[pos]
-    # Get all pieces that are in contact with the removed one and try to
-    # reach all of them from one of them.
-    occupied = hive.level.occupied_surroundings(pos)
-    assert occupied
-    visited = set()
-    to_explore = {occupied[0]}
-    to_reach = set(occupied[1:])
-    res = False
-
-    while len(to_explore) > 0:
-        found = []
-        for cell in to_explore:
-            found += hive.level.occupied_surroundings(cell)
-            visited.add(cell)
-        to_explore = set(found) - visited
-        if to_reach.issubset(visited):
-            res = True
-            break
-    hive.level.tiles[pos] = [piece]
-
-    return res
+    # the piece is alone in its cell, so the hive breaks if and only if the cell is an articulation point
+    return pos not in hive.level.pinned_cells()
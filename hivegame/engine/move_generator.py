@@ -0,0 +1,118 @@
+from typing import Dict, Optional, Set, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from engine.hive_utils import get_queen_name
+import engine.hive_validation as valid
+import engine.action_space as action_space
+from hivegame.pieces.piece import HivePiece
+from hivegame.utils import hexutil
+
+if TYPE_CHECKING:
+    from engine.hive import Hive
+
+# Incremental version of :func:`.hive_representation.get_all_action_vector`.
+#
+# The game state keeps a MoveCache for each player, and records every cell changed since the cache was last
+# updated. The next time the action vector of the player is needed, only the move vectors of the pieces around the
+# changed cells are computed again. The moves of a piece depend on the cells in a distance given by its kind, or on
+# the whole hive for ants.
+#
+# The one hive rule and the queen rules are checked on every update. The pinned cells and the cells where a piece
+# can be placed are maintained by the game state.
+
+_DIRECTION_COUNT = 6
+# Distance of the cells the move vector of a piece depends on. None means the whole hive.
+_MOVE_RADIUS = {'Q': 1, 'B': 1, 'G': 1, 'S': 3, 'A': None}
+
+_TYPES = action_space.ACTION_TABLE[:, 0]
+_INIT_SLICE = slice(0, int(np.count_nonzero(_TYPES == action_space.INIT)))
+_PLACE_SLICE = slice(_INIT_SLICE.stop, _INIT_SLICE.stop + int(np.count_nonzero(_TYPES == action_space.PLACE)))
+# First action number of the moves of each piece id
+_MOVE_OFFSETS = [int(np.flatnonzero((_TYPES == action_space.MOVE) & (action_space.ACTION_TABLE[:, 1] == piece_id))[0])
+                 for piece_id in range(action_space.PIECE_COUNT)]
+_OFF_DIAGONAL = ~np.eye(action_space.PIECE_COUNT, dtype=bool)
+
+
+class MoveCache(object):
+    """
+    Action vector of one player, and the move vectors it is built of. Owned by the game state, see
+    :func:`hivegame.utils.game_state.GameState.move_cache`.
+    """
+
+    def __init__(self):
+        self.dirty: Set[hexutil.Hex] = set()    # cells changed since the last update
+        self.vector: Optional[np.ndarray] = None
+        # piece -> (its cell, move vector of the piece as returned by available_moves_vector)
+        self.moves: Dict[HivePiece, Tuple[hexutil.Hex, np.ndarray]] = {}
+
+    def copy(self) -> 'MoveCache':
+        # the arrays are never modified in place
+        result = MoveCache()
+        result.dirty = set(self.dirty)
+        result.vector = self.vector
+        result.moves = dict(self.moves)
+        return result
+
+    def is_outdated(self, cell: hexutil.Hex, radius: Optional[int]) -> bool:
+        """
+        :return: True if a cell not further than radius from the given cell has changed since the last update
+        """
+        if radius is None:
+            return bool(self.dirty)
+        return any(cell.distance(changed) <= radius for changed in self.dirty)
+
+
+def action_vector(hive: 'Hive') -> np.ndarray:
+    """
+    Same as :func:`.hive_representation.get_all_action_vector`, updated from the previous action vector of the
+    player to move.
+
+    :return: Read-only int8 array over the fixed size action space. It is shared by the following calls until the
+             state changes, so it must not be modified.
+    """
+    level = hive.level
+    player = level.current_player
+    cache = level.move_cache(player)
+    if cache.vector is not None and not cache.dirty:
+        return cache.vector
+
+    pieces = action_space.sorted_pieces(player)
+    my_pieces = level.get_played_pieces(player)
+    vector = np.zeros(action_space.ACTION_SIZE, dtype=np.int8)
+    if not my_pieces:
+        # The first placement, see get_all_action_vector
+        vector[_INIT_SLICE] = 1
+        cache.moves.clear()
+    else:
+        queen_pos = hive.locate(get_queen_name(player))
+        placeable = np.array([p not in my_pieces and not (len(my_pieces) == 3 and not queen_pos and p.kind != "Q")
+                              for p in pieces], dtype=bool)
+        # the neighbours of the placed pieces where a piece can be placed
+        placement_cells = level.placement_cells(player)
+        adjacent = np.zeros((action_space.PIECE_COUNT, _DIRECTION_COUNT), dtype=bool)
+        for piece_id, piece in enumerate(pieces):
+            pos = level.find_piece_position(piece)
+            if pos:
+                adjacent[piece_id] = [nb in placement_cells for nb in pos.neighbours()]
+        place = placeable[:, np.newaxis, np.newaxis] & adjacent[np.newaxis, :, :]
+        vector[_PLACE_SLICE] = place[_OFF_DIAGONAL].ravel()
+
+        # moving pieces
+        for piece_id, piece in enumerate(pieces):
+            pos = level.find_piece_position(piece)
+            if not pos or not queen_pos or not valid.validate_one_hive(hive, pos, piece):
+                # not updated, so it can not be reused later
+                cache.moves.pop(piece, None)
+                continue
+            cached = cache.moves.get(piece)
+            if cached is None or cached[0] != pos or cache.is_outdated(pos, _MOVE_RADIUS[piece.kind]):
+                cached = (pos, np.array(piece.available_moves_vector(hive, pos), dtype=np.int8))
+                cache.moves[piece] = cached
+            offset = _MOVE_OFFSETS[piece_id]
+            vector[offset:offset + piece.move_vector_size] = cached[1]
+
+    vector.flags.writeable = False
+    cache.vector = vector
+    cache.dirty = set()
+    return vector
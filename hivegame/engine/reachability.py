@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List
+
+from hivegame.utils import hexutil
+
+if TYPE_CHECKING:
+    from engine.hive import Hive
+
+# Maximum number of (position, source cell) entries kept in the memo
+MEMO_SIZE = 8192
+
+# Ant targets of already seen positions. Keys are (board hash, source cell relative to the anchor), the values are
+# the sorted target cells relative to the anchor. Since the board hash is translation invariant, the same entry is
+# found for translated positions too.
+_ant_memo = OrderedDict()
+# Spider targets of already seen positions, in the same format
+_spider_memo = OrderedDict()
+
+
+def _memo_get(memo: OrderedDict, key):
+    result = memo.get(key)
+    if result is not None:
+        memo.move_to_end(key)
+    return result
+
+
+def _memo_put(memo: OrderedDict, key, value) -> None:
+    memo[key] = value
+    if len(memo) > MEMO_SIZE:
+        memo.popitem(last=False)
+
+
+def clear_memo() -> None:
+    _ant_memo.clear()
+    _spider_memo.clear()
+
+
+def ant_moves(hive: 'Hive', pos: hexutil.Hex) -> List[hexutil.Hex]:
+    """
+    Cells reachable by sliding around the hive from the given cell, i.e. the targets of an ant. The flood fill walks
+    the slide graph maintained by the game state, and the result is memoized against the position hash.
+    :param hive: game state
+    :param pos: Position of the piece on top of the cell
+    :return: Reachable cells in sorted order. This order is used by the fixed size action space.
+    """
+    level = hive.level
+    anchor = level.anchor
+    key = (level.board_hash, pos - anchor)
+    offsets = _memo_get(_ant_memo, key)
+    if offsets is None:
+        targets = _ant_flood_fill(hive, pos)
+        _memo_put(_ant_memo, key, tuple(target - anchor for target in targets))
+        return targets
+    # translation keeps the order of the cells
+    return [anchor + offset for offset in offsets]
+
+
+def _ant_flood_fill(hive: 'Hive', pos: hexutil.Hex) -> List[hexutil.Hex]:
+    level = hive.level
+    to_explore = {pos}
+    visited = {pos}
+
+    while len(to_explore) > 0:
+        found = set()
+        for c in to_explore:
+            # the ant itself is treated as picked up
+            found.update(level.slide_moves(c, lifted=pos))
+        found.difference_update(visited)
+
+        visited.update(found)
+        to_explore = found
+    # cannot step to the same tile
+    visited.remove(pos)
+    return sorted(visited)
+
+
+def spider_moves(hive: 'Hive', pos: hexutil.Hex) -> List[hexutil.Hex]:
+    """
+    Cells reachable with exactly three sliding steps around the hive from the given cell, without visiting a cell
+    twice, i.e. the targets of a spider. Every path is walked on the slide graph maintained by the game state, and the
+    result is memoized against the position hash.
+    :param hive: game state
+    :param pos: Position of the piece on top of the cell
+    :return: Reachable cells in sorted order. This order is used by the fixed size action space.
+    """
+    level = hive.level
+    anchor = level.anchor
+    key = (level.board_hash, pos - anchor)
+    offsets = _memo_get(_spider_memo, key)
+    if offsets is None:
+        targets = _spider_walk(hive, pos)
+        _memo_put(_spider_memo, key, tuple(target - anchor for target in targets))
+        return targets
+    # translation keeps the order of the cells
+    return [anchor + offset for offset in offsets]
+
+
+def _spider_walk(hive: 'Hive', pos: hexutil.Hex) -> List[hexutil.Hex]:
+    level = hive.level
+    targets = set()
+    # depth first search on the paths starting from the spider
+    paths = [(pos,)]
+    while paths:
+        path = paths.pop()
+        if len(path) == 4:
+            targets.add(path[-1])
+            continue
+        # the spider itself is treated as picked up
+        for cell in level.slide_moves(path[-1], lifted=pos):
+            if cell not in path:
+                paths.append(path + (cell,))
+    return sorted(targets)
@@ -0,0 +1,156 @@
+from typing import Dict, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from engine.hive_utils import Direction, Player
+import hivegame.pieces.piece_factory as piece_fact
+from hivegame.engine import action_space
+from hivegame.utils import hexutil
+
+if TYPE_CHECKING:
+    from hivegame.engine.hive import Hive
+
+# Symmetries of the hexagonal grid. The kth symmetry (0 <= k < 12) is a rotation by k % 6 steps of 60 degrees
+# clockwise, preceded by a reflection on the west-east axis if k >= 6. Symmetry 0 is the identity.
+#
+# Directions are numbered clockwise starting from west (see :mod:`.hive_representation`), so a symmetry maps the
+# 0 based direction d to ((-d if reflected else d) + rotation) % 6.
+
+SYMMETRY_COUNT = 12
+_DIRECTION_COUNT = 6
+# Largest value of the adjacency matrix: the piece is set, but there is no neighbour that way
+_NOT_ADJACENT = 9
+# Kinds of the pieces whose move vector is indexed by direction. The other pieces (ants and spiders) index their
+# targets in sorted order, which depends on the position.
+_DIRECTION_MOVE_KINDS = ('Q', 'B', 'G')
+_KINDS = [piece.kind for piece in piece_fact.sorted_piece_list(Player.WHITE)]
+# Piece ids of the ants and spiders, and the action number of their first move
+_POSITIONAL_MOVES = [(piece_id, int(np.flatnonzero((action_space.ACTION_TABLE[:, 0] == action_space.MOVE) &
+                                                   (action_space.ACTION_TABLE[:, 1] == piece_id))[0]))
+                     for piece_id, kind in enumerate(_KINDS) if kind not in _DIRECTION_MOVE_KINDS]
+
+
+def _map_direction(k: int, direction: int) -> int:
+    """
+    :param direction: 0 based direction, i.e. index in :func:`hexutil.Hex.neighbours`
+    :return: 0 based direction after the kth symmetry
+    """
+    reflected = -direction if k >= _DIRECTION_COUNT else direction
+    return (reflected + k) % _DIRECTION_COUNT
+
+
+def transform_cell(cell: hexutil.Hex, k: int) -> hexutil.Hex:
+    """
+    :return: The cell after the kth symmetry around the origin
+    """
+    if k >= _DIRECTION_COUNT:
+        cell = hexutil.Hex(cell.x, -cell.y)
+    for _ in range(k % _DIRECTION_COUNT):
+        cell = cell.rotate_left()  # one step clockwise in the order of the directions
+    return cell
+
+
+def _build_board_table() -> np.ndarray:
+    """
+    :return: Array of shape (SYMMETRY_COUNT, _NOT_ADJACENT + 1). Value v of the adjacency matrix is mapped to
+             table[k, v] by the kth symmetry. Only the directions change, the stacking and the not set values are
+             kept.
+    """
+    table = np.tile(np.arange(_NOT_ADJACENT + 1, dtype=np.int8), (SYMMETRY_COUNT, 1))
+    for k in range(SYMMETRY_COUNT):
+        for direction in range(_DIRECTION_COUNT):
+            table[k, direction + Direction.HX_W] = _map_direction(k, direction) + Direction.HX_W
+    return table
+
+
+def _build_policy_table() -> np.ndarray:
+    """
+    :return: Array of shape (SYMMETRY_COUNT, ACTION_SIZE). The probability of action a after the kth symmetry is the
+             probability of action table[k, a] before it.
+    """
+    encode: Dict[Tuple[int, int, int, int], int] = {tuple(row): i
+                                                    for i, row in enumerate(action_space.ACTION_TABLE.tolist())}
+    table = np.zeros((SYMMETRY_COUNT, action_space.ACTION_SIZE), dtype=np.int64)
+    for k in range(SYMMETRY_COUNT):
+        for action_number, (atype, piece_id, adj_piece_id, value) in enumerate(action_space.ACTION_TABLE.tolist()):
+            if atype == action_space.PLACE:
+                value = _map_direction(k, value - Direction.HX_W) + Direction.HX_W
+            elif atype == action_space.MOVE and _KINDS[piece_id] in _DIRECTION_MOVE_KINDS:
+                value = _map_direction(k, value)
+            # the inverse of the mapping, so the table can be used to gather
+            table[k, encode[(atype, piece_id, adj_piece_id, value)]] = action_number
+    return table
+
+
+BOARD_TABLE = _build_board_table()
+POLICY_TABLE = _build_policy_table()
+# Images of the cells (2, 0) and (1, 1), indexed by [symmetry, cell, coordinate]. Every cell is an integer
+# combination of them, so the symmetries of many cells can be computed at once, see :func:`transform_cells`.
+_BASIS_IMAGES = np.array([[transform_cell(cell, k) for cell in (hexutil.Hex(2, 0), hexutil.Hex(1, 1))]
+                          for k in range(SYMMETRY_COUNT)], dtype=np.int64)
+
+
+def transform_cells(cells: np.ndarray) -> np.ndarray:
+    """
+    :param cells: Integer array of shape (n, 2), the x and y coordinates of cells
+    :return: Array of shape (SYMMETRY_COUNT, n, 2), the cells after each symmetry
+    """
+    cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+    coefficients = np.stack([(cells[:, 0] - cells[:, 1]) // 2, cells[:, 1]], axis=1)
+    return np.einsum('nb,kbc->knc', coefficients, _BASIS_IMAGES)
+
+
+def _target_ranks(targets) -> np.ndarray:
+    """
+    :param targets: Cells in sorted order
+    :return: Array of shape (SYMMETRY_COUNT, len(targets)). The ith target is at position ranks[k, i] of the sorted
+             targets after the kth symmetry.
+    """
+    images = transform_cells([tuple(target) for target in targets])
+    # cells are sorted by x, then y
+    keys = images[:, :, 0] * (1 << 20) + images[:, :, 1]
+    return np.argsort(np.argsort(keys, axis=1), axis=1)
+
+
+def policy_table(hive: 'Hive', pi: np.ndarray = None) -> np.ndarray:
+    """
+    :param hive: The state of the policy. Its current player is the player to move of the action space.
+    :param pi: If given, only the pieces with a non-zero probability to move are remapped.
+    :return: POLICY_TABLE completed with the order of the ant and spider targets in the position
+    """
+    table = POLICY_TABLE
+    pieces = piece_fact.sorted_piece_list(hive.current_player)
+    for piece_id, first_move in _POSITIONAL_MOVES:
+        piece = pieces[piece_id]
+        size = piece.move_vector_size
+        if pi is not None and not np.any(np.asarray(pi)[first_move:first_move + size]):
+            continue
+        pos = hive.level.find_piece_position(piece)
+        targets = piece.available_moves(hive, pos) if pos else []
+        if len(targets) < 2:
+            continue
+        if table is POLICY_TABLE:
+            table = POLICY_TABLE.copy()
+        rows = np.arange(SYMMETRY_COUNT)[:, np.newaxis]
+        table[rows, first_move + _target_ranks(targets)] = first_move + np.arange(len(targets))
+    return table
+
+
+def symmetric_boards(board: np.ndarray) -> np.ndarray:
+    """
+    :param board: Adjacency matrix, see :func:`.hive_representation.adjacency_matrix`
+    :return: Array of shape (SYMMETRY_COUNT,) + board.shape, the board after each symmetry
+    """
+    return BOARD_TABLE[:, np.asarray(board, dtype=np.int8)]
+
+
+def symmetric_policies(pi: np.ndarray, hive: 'Hive' = None) -> np.ndarray:
+    """
+    :param pi: Policy vector over the fixed size action space
+    :param hive: The state of the policy. The order of the ant and spider targets depends on the position, so those
+                 probabilities are only permuted if it is given.
+    :return: Array of shape (SYMMETRY_COUNT, ACTION_SIZE), the policy after each symmetry
+    """
+    pi = np.asarray(pi)
+    table = POLICY_TABLE if hive is None else policy_table(hive, pi)
+    return pi[table]
@@ -1,7 +1,6 @@
 from engine.hive_representation import *
 from engine.hive import Hive
 
-from copy import deepcopy
 import sys
 
 def perft(hive, depth) -> int:
@@ -11,22 +10,20 @@ def perft(hive, depth) -> int:
 
     move_list = get_all_possible_actions_nonidentical(hive)
     for move in move_list:
-        # TODO implement undo move instead of deep copy
-        new_hive = deepcopy(hive)
         try:
-            new_hive.action_piece_to(deepcopy(move[0]), move[1])
+            token = hive.make_action(move[0], move[1])
         except Exception as e:
             print("HiveException with message: \"{}\"".format(e))
             print("action was: {}".format(move))
             print("State of map was:")
-            print(new_hive)
+            print(hive)
             raise
-        nodes += perft(new_hive, depth - 1)
+        nodes += perft(hive, depth - 1)
+        hive.unmake_action(token)
     return nodes
 
 def main():
     hive = Hive()
-    hive.setup()
     DEPTH = 5
     number_of_nodes = perft(hive, DEPTH)
     print("Number of nodes on level {} is: {}".format(DEPTH, number_of_nodes))
@@ -3,6 +3,7 @@ from hivegame.pieces.piece import HivePiece
 
 from typing import TYPE_CHECKING
 from hivegame.utils import hexutil
+from hivegame.engine import reachability
 if TYPE_CHECKING:
     from engine.hive import Hive
 
@@ -16,55 +17,16 @@ class AntPiece(HivePiece):
     def validate_move(self, hive: 'Hive', end_cell: hexutil.Hex, pos: hexutil.Hex):
         if self.check_blocked(hive, pos):
             return False
-        # remove piece temporary
-        del hive.level.tiles[pos]
-
-        toExplore = {pos}
-        visited = {pos}
-        res = False
-
-        while len(toExplore) > 0:
-            found = set()
-            for c in toExplore:
-                found.update(hive.bee_moves(c))
-            found.difference_update(visited)
-            # have we found the endCell?
-            if end_cell in found:
-                res = True
-                break
-
-            visited.update(found)
-            toExplore = found
-
-        hive.level.tiles[pos] = [self]
-        return res
+        return end_cell in reachability.ant_moves(hive, pos)
     
     def available_moves(self, hive: 'Hive', pos: hexutil.Hex):
         """
-        :return: available moves. The order of the list depends on the distance of the target cell.
-        Cells in a shorter distance come first.
+        :return: available moves in sorted order. See :func:`hivegame.engine.reachability.ant_moves`
         """
         super().available_moves(hive, pos)
         if self.check_blocked(hive, pos):
             return []
-        # remove piece temporary
-        del hive.level.tiles[pos]
-
-        toExplore = {pos}
-        visited = {pos}
-
-        while len(toExplore) > 0:
-            found = set()
-            for c in toExplore:
-                found.update(hive.bee_moves(c))
-            found.difference_update(visited)
-
-            visited.update(found)
-            toExplore = found
-        hive.level.tiles[pos] = [self]
-        # cannot step to the same tile
-        visited.remove(pos)
-        return sorted(visited)
+        return reachability.ant_moves(hive, pos)
 
     def available_moves_vector(self, hive: 'Hive', pos: hexutil.Hex):
         """
@@ -14,14 +14,7 @@ class BeePiece(HivePiece):
     def validate_move(self, hive: 'Hive', endcell: hexutil.Hex, pos: hexutil.Hex):
         if self.check_blocked(hive, pos):
             return False
-        res = True
-        # remove piece temporary
-        del hive.level.tiles[pos]
-        possible_end_cells = hive.bee_moves(pos)
-        if not endcell in possible_end_cells:
-            res = False
-        hive.level.tiles[pos] = [self]
-        return res
+        return endcell in hive.bee_moves(pos)
 
     def available_moves(self, hive: 'Hive', pos: hexutil.Hex):
         if self.check_blocked(hive, pos):
@@ -23,12 +23,9 @@ class BeetlePiece(HivePiece):
         if len(hive.level.get_tile_content(pos)) > 1:
             res += pos.neighbours()
         else:
-            # remove piece temporary
-            del hive.level.tiles[pos]
             res += (hive.bee_moves(pos) +
                    hive.level.occupied_surroundings(pos)
                    )
-            hive.level.tiles[pos] = [self]
 
         return res
 
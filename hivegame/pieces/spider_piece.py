@@ -2,6 +2,7 @@ from hivegame.pieces.piece import HivePiece
 
 from typing import TYPE_CHECKING
 from hivegame.utils import hexutil
+from hivegame.engine import reachability
 if TYPE_CHECKING:
     from engine.hive import Hive
 
@@ -12,37 +13,18 @@ class SpiderPiece(HivePiece):
         return super().__new__(cls, color, "S", number)
 
     def validate_move(self, hive: 'Hive', endcell: hexutil.Hex, pos:hexutil.Hex):
-        return endcell in self.available_moves(hive, pos)
-    
+        if self.check_blocked(hive, pos):
+            return False
+        return endcell in reachability.spider_moves(hive, pos)
+
     def available_moves(self, hive: 'Hive', pos:hexutil.Hex):
+        """
+        :return: available moves in sorted order. See :func:`hivegame.engine.reachability.spider_moves`
+        """
         super().available_moves(hive, pos)
         if self.check_blocked(hive, pos):
             return []
-
-        # remove piece temporary
-        del hive.level.tiles[pos]
-
-        visited = set()
-        firstStep = set()
-        secondStep = set()
-        thirdStep = set()
-
-        visited.add(pos)
-
-        firstStep.update(set(hive.bee_moves(pos)))
-        visited.update(firstStep)
-
-        for c in firstStep:
-            secondStep.update(set(hive.bee_moves(c)))
-        secondStep.difference_update(visited)
-        visited.update(secondStep)
-
-        for c in secondStep:
-            thirdStep.update(set(hive.bee_moves(c)))
-        thirdStep.difference_update(visited)
-
-        hive.level.tiles[pos] = [self]
-        return sorted(thirdStep)
+        return reachability.spider_moves(hive, pos)
 
     def available_moves_vector(self, hive: 'Hive', pos:hexutil.Hex):
         """
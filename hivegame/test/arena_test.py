@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+from hivegame.AI.random_player import RandomPlayer
+from hivegame.arena import Arena, ParallelArena, SPRT
+
+
+class TestParallelArena(TestCase):
+
+    def setUp(self):
+        self.arena = ParallelArena({'a': RandomPlayer, 'b': RandomPlayer, 'c': RandomPlayer}, 2)
+
+    def test_play_games(self):
+        a_wins, b_wins, draws = self.arena.playGames('a', 'b', 4)
+        self.assertEqual(4, a_wins + b_wins + draws)
+        # colors are swapped in half of the games
+        self.assertEqual(2, sum(1 for r in self.arena.results if r.white == 'a'))
+        self.assertEqual(2, sum(1 for r in self.arena.results if r.white == 'b'))
+
+    def test_play_odd_games(self):
+        a_wins, b_wins, draws = self.arena.playGames('a', 'b', 3)
+        self.assertEqual(3, a_wins + b_wins + draws)
+        self.assertEqual(2, sum(1 for r in self.arena.results if r.white == 'a'))
+
+    def test_sequential_budget(self):
+        # the test is never decided, every game of the odd budget is played, but not more
+        sprt = SPRT(0.49, 0.51, 1e-9, 1e-9)
+        wins1, wins2, draws, decision = self.arena.playGamesSequential('a', 'b', 5, sprt)
+        self.assertEqual(5, wins1 + wins2 + draws)
+        self.assertEqual(5, len(self.arena.results))
+        self.assertEqual(SPRT.UNDECIDED, decision)
+
+    def test_tournament(self):
+        table = self.arena.tournament(2)
+        self.assertEqual({('a', 'b'), ('a', 'c'), ('b', 'c')}, set(table))
+        self.assertTrue(all(sum(score) == 2 for score in table.values()))
+        self.assertEqual(6, len(self.arena.results))
+
+
+class TestSPRT(TestCase):
+
+    def test_decide(self):
+        sprt = SPRT.around(0.5, 0.1)
+        self.assertEqual(SPRT.UNDECIDED, sprt.decide(0, 0))
+        self.assertEqual(SPRT.UNDECIDED, sprt.decide(6, 4))
+        self.assertEqual(SPRT.ACCEPT, sprt.decide(40, 10))
+        self.assertEqual(SPRT.REJECT, sprt.decide(10, 40))
+        self.assertAlmostEqual(0, sprt.llr(5, 5))
+
+    def test_early_stop(self):
+        # a single decisive game settles this test
+        sprt = SPRT(0.1, 0.9, 0.3, 0.3)
+        wins1, wins2, draws, decision = Arena(RandomPlayer(), RandomPlayer()).playGamesSequential(40, sprt)
+        self.assertEqual(1, wins1 + wins2)
+        self.assertEqual(SPRT.ACCEPT if wins2 else SPRT.REJECT, decision)
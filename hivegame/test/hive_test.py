@@ -10,8 +10,10 @@ from hivegame.engine.hive_utils import Direction, GameStatus, Player
 
 import hivegame.engine.hive_validation as valid
 import hivegame.engine.hive_representation as represent
+import hivegame.engine.move_generator as move_generator
 from utils import hexutil
 import logging
+import random
 import sys
 
 FORMAT = "[%(filename)s:%(lineno)s - %(funcName)20s() ] %(message)s"
@@ -58,6 +60,12 @@ class TestHive(TestCase):
         self.assertFalse(valid.validate_one_hive(self.hive, wS1_pos, wS1))
         self.assertTrue(valid.validate_one_hive(self.hive, self.hive.locate('wQ1'), self.hive.get_piece_by_name('wQ1')))
 
+        expected = {self.hive.locate(name) for name in ('wB1', 'wS2', 'wS1', 'bS1', 'bQ1')}
+        self.assertEqual(expected, self.hive.level.pinned_cells())
+        # cache is invalidated when the hive changes
+        self.hive.level.append_to(self.hive.get_piece_by_name('bA2'), self.hive.poc2cell('bA1', Direction.HX_SW))
+        self.assertNotIn(self.hive.locate('bQ1'), self.hive.level.pinned_cells())
+
     def test_one_hive_with_load_state(self):
         #for k,v in represent.get_adjacency_state(self.hive).items():
         #    print("{}: {}".format(k, v))
@@ -82,6 +90,26 @@ class TestHive(TestCase):
         expected = {hexutil.Hex(1, 1), hexutil.Hex(-2, 2)}
         self.assertEqual(expected, set(self.hive.bee_moves(bee_pos)))
 
+    def test_slide_graph(self):
+        def rebuilt_perimeter(level):
+            return {cell: level._slide_targets(cell) for hexagon in level.tiles for cell in hexagon.neighbours()
+                    if cell not in level.tiles}
+
+        self.assertEqual(rebuilt_perimeter(self.hive.level), self.hive.level._slides)
+        self.hive.level.current_player = Player.WHITE
+        token = self.hive.make_action(self.hive.get_piece_by_name('wQ1'), self.hive.poc2cell('wS1', Direction.HX_W))
+        self.assertEqual(rebuilt_perimeter(self.hive.level), self.hive.level._slides)
+        self.hive.unmake_action(token)
+        self.assertEqual(rebuilt_perimeter(self.hive.level), self.hive.level._slides)
+
+        # sliding next to a picked up piece
+        wQ1 = self.hive.get_piece_by_name('wQ1')
+        wQ1_pos = self.hive.locate('wQ1')
+        self.hive.level.remove_from(wQ1, wQ1_pos)
+        expected = self.hive.bee_moves(wQ1_pos + hexutil.Hex(1, -1))
+        self.hive.level.append_to(wQ1, wQ1_pos)
+        self.assertEqual(expected, self.hive.level.slide_moves(wQ1_pos + hexutil.Hex(1, -1), lifted=wQ1_pos))
+
     def test_ant_moves(self):
         end_cell = self.hive.poc2cell('wS1', Direction.HX_W)
         self.assertFalse(
@@ -113,6 +141,19 @@ class TestHive(TestCase):
             self.hive.get_piece_by_name('bA1').validate_move(self.hive, end_cell, self.hive.locate("bA1"))
         )
 
+    def test_ant_moves_memo(self):
+        bA1 = self.hive.get_piece_by_name('bA1')
+        expected = bA1.available_moves(self.hive, self.hive.locate('bA1'))
+        self.assertEqual(sorted(expected), expected)
+
+        # a translated position is found in the memo and returned in the same order
+        offset = hexutil.Hex(3, 1)
+        shifted = Hive()
+        for hexagon, pieces in self.hive.level.tiles.items():
+            for p in pieces:
+                shifted.level.append_to(p, hexagon + offset)
+        self.assertEqual([cell + offset for cell in expected], bA1.available_moves(shifted, shifted.locate('bA1')))
+
     def test_beetle_moves(self):
         # moving in the ground level
         end_cell = self.hive.poc2cell('wS2', Direction.HX_E)
@@ -235,6 +276,21 @@ class TestHive(TestCase):
             self.hive.get_piece_by_name('bS2').validate_move(self.hive, end_cell, self.hive.locate("bS2"))
         )
 
+    def test_spider_moves_around_loop(self):
+        # the spider at the origin closes a ring of pieces around the two free cells south of it
+        hive = Hive()
+        spider = hive.get_piece_by_name('wS1')
+        for name, cell in (('wS1', (0, 0)), ('bA1', (-2, 0)), ('bG1', (-3, 1)), ('bB1', (-2, 2)), ('bG2', (-1, 3)),
+                           ('bA3', (1, 3)), ('bB2', (2, 2)), ('bG3', (3, 1)), ('bA2', (2, 0))):
+            hive.level.append_to(hive.get_piece_by_name(name), hexutil.Hex(*cell))
+        # one step from the spider, and also the end of the three step path through (-1, 1) and (0, 2)
+        target = hexutil.Hex(1, 1)
+        self.assertIn(target, hive.level.slide_moves(hexutil.origin, lifted=hexutil.origin))
+        moves = spider.available_moves(hive, hexutil.origin)
+        self.assertIn(target, moves)
+        self.assertEqual(sorted(moves), moves)
+        self.assertTrue(spider.validate_move(hive, target, hexutil.origin))
+
     def test_validate_place_piece(self):
         white_ant_1 = AntPiece('w', 1)
         black_beetle_2 = BeetlePiece('b', 2)
@@ -267,6 +323,103 @@ class TestHive(TestCase):
         self.assertTrue(BeetlePiece('b', 1) in pieces)
         self.assertTrue(SpiderPiece('b', 1) in pieces)
 
+    def test_piece_position_index(self):
+        bB1 = self.hive.get_piece_by_name('bB1')
+        bS1_pos = self.hive.locate('bS1')
+        self.hive.move_piece_without_action('bB1', 'bS1', Direction.HX_O)
+        self.assertEqual(bS1_pos, self.hive.level.find_piece_position(bB1))
+        self.assertEqual(bS1_pos, self.hive.locate('bS1'))
+
+        self.hive.level.remove_from(bB1, bS1_pos)
+        self.assertIsNone(self.hive.locate('bB1'))
+        self.assertFalse(bB1 in self.hive.level.get_played_pieces())
+        self.hive.level.append_to(bB1, bS1_pos)
+        self.assertEqual(bS1_pos, self.hive.locate('bB1'))
+        self.assertEqual(bB1, self.hive.level.get_tile_content(bS1_pos)[-1])
+
+    def test_make_unmake_action(self):
+        tiles_before = {hexagon: list(pieces) for hexagon, pieces in self.hive.level.tiles.items()}
+        bB1 = self.hive.get_piece_by_name('bB1')
+        bB1_pos = self.hive.locate('bB1')
+
+        # move beetle on top of the spider, then place a piece
+        move_token = self.hive.make_action(bB1, self.hive.locate('bS1'))
+        self.assertEqual(Player.WHITE, self.hive.current_player)
+        place_token = self.hive.make_action(self.hive.get_piece_by_name('wA1'),
+                                            self.hive.poc2cell('wG1', Direction.HX_SW))
+        self.assertEqual(Player.BLACK, self.hive.current_player)
+
+        self.hive.unmake_action(place_token)
+        self.assertIsNone(self.hive.locate('wA1'))
+        self.hive.unmake_action(move_token)
+        self.assertEqual(bB1_pos, self.hive.locate('bB1'))
+        self.assertEqual(Player.BLACK, self.hive.current_player)
+        self.assertEqual(tiles_before, self.hive.level.tiles)
+
+    def test_placement_cells(self):
+        def brute_force(player):
+            level = self.hive.level
+            return {cell for cell in level.perimeter()
+                    if all(level.get_tile_content(nb)[-1].color == player for nb in level.occupied_surroundings(cell))}
+
+        bB1 = self.hive.get_piece_by_name('bB1')
+        bB1_pos = self.hive.locate('bB1')
+        wS2_pos = self.hive.locate('wS2')
+        # the black beetle climbs next to the white spider, then on top of it, then back
+        for target in (self.hive.locate('bS1') + hexutil.Hex(-1, 1), wS2_pos, bB1_pos):
+            self.hive.level.move_to(bB1, self.hive.locate('bB1'), target)
+            for player in (Player.WHITE, Player.BLACK):
+                self.assertEqual(brute_force(player), self.hive.level.placement_cells(player))
+        self.hive.level.move_to(bB1, bB1_pos, wS2_pos)
+        # the white spider is covered, the white beetle is still next to the cell south-west of it
+        self.assertEqual(1, self.hive.level.touch_count(Player.BLACK, wS2_pos + hexutil.Hex(-1, 1)))
+        self.assertEqual(1, self.hive.level.touch_count(Player.WHITE, wS2_pos + hexutil.Hex(-1, 1)))
+        self.assertEqual(0, self.hive.level.touch_count(Player.WHITE, wS2_pos + hexutil.Hex(1, 1)))
+
+    def test_incremental_action_vector(self):
+        rnd = random.Random(0)
+        hive = self.hive
+        for _ in range(40):
+            self.assertEqual(represent.get_all_action_vector(hive), move_generator.action_vector(hive).tolist())
+            actions = sorted(represent.get_all_possible_actions(hive), key=lambda a: (str(a[0]), a[1]))
+            if not actions:
+                break
+            # look ahead and take the action back
+            token = hive.make_action(*rnd.choice(actions))
+            self.assertEqual(represent.get_all_action_vector(hive), move_generator.action_vector(hive).tolist())
+            hive.unmake_action(token)
+            hive = hive.copy()
+            hive.action_piece_to(*rnd.choice(actions))
+
+    def test_zobrist_hash(self):
+        start_hash = self.hive.level.zobrist_hash
+
+        # the same position shifted by one cell
+        shifted = Hive()
+        for hexagon, pieces in self.hive.level.tiles.items():
+            for p in pieces:
+                shifted.level.append_to(p, hexagon + hexutil.Hex(1, 1))
+        shifted.level.current_player = Player.BLACK
+        self.assertEqual(start_hash, shifted.level.zobrist_hash)
+
+        # hash is updated incrementally and restored exactly
+        token = self.hive.make_action(self.hive.get_piece_by_name('bB1'), self.hive.locate('bS1'))
+        self.assertNotEqual(start_hash, self.hive.level.zobrist_hash)
+        incremental_hash = self.hive.level.zobrist_hash
+        self.hive.level._rehash()
+        self.assertEqual(incremental_hash, self.hive.level.zobrist_hash)
+        self.hive.unmake_action(token)
+        self.assertEqual(start_hash, self.hive.level.zobrist_hash)
+
+        # canonical hash does not depend on the color of the player to move
+        flipped = Hive()
+        for hexagon, pieces in self.hive.level.tiles.items():
+            for p in pieces:
+                flipped.level.append_to(p._replace(color=Player.WHITE if p.color == Player.BLACK else Player.BLACK),
+                                        hexagon)
+        flipped.level.current_player = Player.WHITE
+        self.assertEqual(self.hive.level.canonical_hash, flipped.level.canonical_hash)
+
     def test_first_move(self):
         r"""Test that we can move a piece on the 3rd turn
         wA1, bA1/*wA1, wG1*|wA1, bS1/*bA1, wQ1\*wA1, bA2*\\bA1, wG1|*wA1
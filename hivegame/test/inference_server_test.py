@@ -0,0 +1,69 @@
+import multiprocessing
+import threading
+from unittest import TestCase
+
+import numpy as np
+
+from hivegame.AI.utils.InferenceServer import InferenceServer
+
+
+class SumPredictor(object):
+    """The value of a board is the sum of its cells"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict_batch(self, boards):
+        self.batch_sizes.append(len(boards))
+        return boards.reshape(len(boards), -1), boards.reshape(len(boards), -1).sum(axis=1)
+
+
+def _remote_worker(client, results):
+    boards = np.stack([np.full((2, 3), 1), np.full((2, 3), 2)])
+    results.put(client.predict_batch(boards))
+
+
+class TestInferenceServer(TestCase):
+
+    def test_batching(self):
+        predictor = SumPredictor()
+        server = InferenceServer(predictor, multiprocessing.get_context('spawn'), 4, (2, 3), 6, max_batch_size=4,
+                                 max_wait=0.5)
+        server.start()
+        results = {}
+
+        def work(client_id):
+            client = server.client(client_id)
+            board = np.full((2, 3), client_id)
+            results[client_id] = client.predict(board)
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        server.stop()
+
+        for client_id, (pi, v) in results.items():
+            self.assertEqual(6 * client_id, v)
+            np.testing.assert_equal(np.full(6, client_id), pi)
+        self.assertEqual(4, server.board_count)
+        self.assertEqual(4, sum(predictor.batch_sizes))
+        # the requests arrive within the waiting time
+        self.assertLess(len(predictor.batch_sizes), 4)
+
+    def test_worker_process(self):
+        context = multiprocessing.get_context('spawn')
+        predictor = SumPredictor()
+        server = InferenceServer(predictor, context, 1, (2, 3), 6, max_client_batch=2)
+        server.start()
+        results = context.Queue()
+        # the boards and the answer go through the shared buffers of the client
+        process = context.Process(target=_remote_worker, args=(server.client(0), results))
+        process.start()
+        pis, vs = results.get(timeout=60)
+        process.join()
+        server.stop()
+        np.testing.assert_equal([6, 12], vs)
+        np.testing.assert_equal(np.full(6, 2), pis[1])
+        self.assertEqual([2], predictor.batch_sizes)
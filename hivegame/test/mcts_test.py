@@ -0,0 +1,177 @@
+from unittest import TestCase
+
+import numpy as np
+
+from hivegame.AI.utils.MCTS import MCTS
+from hivegame.AI.utils.TranspositionTable import TranspositionTable, LRU, VISITS
+from hivegame.engine.environment.aienvironment import ai_environment
+from engine.hive_utils import dotdict
+
+
+class UniformPredictor(object):
+    """Predicts the same policy and value for every board"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, board):
+        return np.ones(ai_environment.getActionSize()) / ai_environment.getActionSize(), 0.0
+
+    def predict_batch(self, boards):
+        self.batch_sizes.append(len(boards))
+        return np.ones((len(boards), ai_environment.getActionSize())) / ai_environment.getActionSize(), \
+            np.zeros(len(boards))
+
+
+class TestMCTS(TestCase):
+    """Verify the search tree statistics"""
+
+    def setUp(self):
+        self.args = dotdict({'numMCTSSims': 25, 'cpuct': 1})
+
+    def test_action_prob(self):
+        state = ai_environment.getInitState()
+        state, _ = ai_environment.getNextState(state, 1, 0)
+        mcts = MCTS(UniformPredictor(), self.args)
+        probs = mcts.getActionProb(state)
+        valids = ai_environment.getValidMoves(state, 1)
+        self.assertEqual(ai_environment.getActionSize(), len(probs))
+        self.assertAlmostEqual(1.0, np.sum(probs))
+        self.assertFalse(np.any(probs[valids == 0]))
+
+        node = mcts.nodes[ai_environment.stringRepresentation(state)]
+        np.testing.assert_equal(np.flatnonzero(valids), node.actions)
+        # the first simulation only expands the root
+        self.assertEqual(self.args.numMCTSSims - 1, node.visit_count)
+        self.assertEqual(node.visit_count, np.sum(node.visits))
+
+        best = mcts.getActionProb(state, temp=0)
+        self.assertEqual(1, np.sum(best))
+        self.assertEqual(node.actions[np.argmax(node.visits)], np.argmax(best))
+
+    def test_select(self):
+        state = ai_environment.getInitState()
+        mcts = MCTS(UniformPredictor(), self.args)
+        mcts.search(state)
+        node = mcts.nodes[ai_environment.stringRepresentation(state)]
+        # equal priors, the first unvisited action is chosen
+        self.assertEqual(0, node.select(1))
+        node.update(0, -1.0)
+        self.assertEqual(-1.0, node.q[0])
+        self.assertEqual(1, node.select(1))
+
+    def test_batched_search(self):
+        self.args['mctsBatchSize'] = 8
+        state = ai_environment.getInitState()
+        predictor = UniformPredictor()
+        mcts = MCTS(predictor, self.args)
+        probs = mcts.getActionProb(state)
+        self.assertAlmostEqual(1.0, np.sum(probs))
+        # the first batch only reaches the root, the others are spread by the virtual loss
+        self.assertEqual([1, 8, 8, 8], predictor.batch_sizes)
+
+        node = mcts.nodes[ai_environment.stringRepresentation(state)]
+        # the first simulation only expands the root
+        self.assertEqual(self.args.numMCTSSims - 1, node.visit_count)
+        self.assertEqual(node.visit_count, np.sum(node.visits))
+        # all virtual losses are taken back
+        np.testing.assert_equal(np.zeros(len(node.actions)), node.value_sum)
+
+    def test_batch_larger_than_simulations(self):
+        for simulations in (1, 4, 5):
+            self.args.update({'numMCTSSims': simulations, 'mctsBatchSize': 8})
+            state = ai_environment.getInitState()
+            mcts = MCTS(UniformPredictor(), self.args)
+            probs = mcts.getActionProb(state)
+            self.assertFalse(np.any(np.isnan(probs)))
+            self.assertAlmostEqual(1.0, np.sum(probs))
+            node = mcts.nodes[ai_environment.stringRepresentation(state)]
+            self.assertEqual(max(simulations - 1, 1), node.visit_count)
+
+    def test_advance(self):
+        state = ai_environment.getInitState()
+        mcts = MCTS(UniformPredictor(), self.args)
+        mcts.getActionProb(state)
+        root = mcts.nodes[ai_environment.stringRepresentation(state)]
+        index = int(np.argmax(root.visits))
+        child, next_player = ai_environment.getNextState(state, 1, root.actions[index])
+        child = ai_environment.getCanonicalForm(child, next_player)
+        # only the key of the child is kept
+        self.assertEqual(ai_environment.stringRepresentation(child), root.children[index])
+        child_node = mcts.nodes[root.children[index]]
+        visits = child_node.visit_count
+
+        mcts.advance(child)
+        self.assertNotIn(ai_environment.stringRepresentation(state), mcts.nodes)
+        self.assertIs(child_node, mcts.nodes[ai_environment.stringRepresentation(child)])
+        # the nodes of the other actions are released
+        self.assertEqual(visits + 1, len(mcts.nodes))
+        mcts.getActionProb(child)
+        self.assertEqual(visits + self.args.numMCTSSims, child_node.visit_count)
+
+    def test_bounded_table(self):
+        for eviction in (LRU, VISITS):
+            self.args.update({'numMCTSSims': 60, 'mctsTableSize': 20, 'mctsEviction': eviction})
+            state = ai_environment.getInitState()
+            mcts = MCTS(UniformPredictor(), self.args)
+            probs = mcts.getActionProb(state)
+            self.assertAlmostEqual(1.0, np.sum(probs))
+            stats = mcts.nodes.stats()
+            self.assertLessEqual(stats['size'], 20)
+            self.assertGreater(stats['evictions'], 0)
+            self.assertGreater(stats['hit_rate'], 0)
+            # the root is used by every simulation, so it is kept
+            self.assertIn(ai_environment.stringRepresentation(state), mcts.nodes)
+
+    def test_smallest_table(self):
+        for eviction in (LRU, VISITS):
+            self.args.update({'numMCTSSims': 30, 'mctsBatchSize': 4, 'mctsTableSize': 2, 'mctsEviction': eviction})
+            state = ai_environment.getInitState()
+            mcts = MCTS(UniformPredictor(), self.args)
+            probs = mcts.getActionProb(state)
+            self.assertFalse(np.any(np.isnan(probs)))
+            self.assertAlmostEqual(1.0, np.sum(probs))
+            self.assertIn(ai_environment.stringRepresentation(state), mcts.nodes)
+
+
+class TestTranspositionTable(TestCase):
+
+    class Node(object):
+        def __init__(self, visit_count):
+            self.visit_count = visit_count
+
+    def test_lru(self):
+        table = TranspositionTable(2)
+        table.put('a', self.Node(5))
+        table.put('b', self.Node(1))
+        self.assertIsNotNone(table.get('a'))
+        table.put('c', self.Node(1))
+        self.assertEqual(['a', 'c'], sorted(key for key, _node in table.items()))
+        self.assertIsNone(table.get('b'))
+        self.assertEqual(0.5, table.hit_rate)
+
+    def test_lowest_visits(self):
+        table = TranspositionTable(3, VISITS)
+        for key, visits in (('a', 7), ('b', 1), ('c', 4), ('d', 0)):
+            table.put(key, self.Node(visits))
+        # the new node is kept even though it has the lowest visit count
+        self.assertEqual(['a', 'c', 'd'], sorted(key for key, _node in table.items()))
+        self.assertEqual(1, table.evictions)
+
+    def test_protected(self):
+        for eviction in (LRU, VISITS):
+            table = TranspositionTable(2, eviction)
+            table.put('a', self.Node(0))
+            table.protect('a')
+            table.put('b', self.Node(5))
+            table.put('c', self.Node(5))
+            self.assertIn('a', table)
+            table.release('a')
+            table.put('d', self.Node(5))
+            table.put('e', self.Node(5))
+            self.assertNotIn('a', table)
+
+    def test_minimum_size(self):
+        for size in (0, 1):
+            with self.assertRaises(AssertionError):
+                TranspositionTable(size)
@@ -0,0 +1,88 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from hivegame.AI.utils.ReplayBuffer import ReplayBuffer
+
+ACTION_SIZE = 10
+
+
+def _examples(value, count):
+    """Examples with boards filled with value"""
+    result = []
+    for i in range(count):
+        pi = np.zeros(ACTION_SIZE)
+        pi[i % ACTION_SIZE] = 0.75
+        pi[(i + 3) % ACTION_SIZE] = 0.25
+        result.append((np.full((3, 2), value).tolist(), pi, value if i % 2 else -value))
+    return result
+
+
+class TestReplayBuffer(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.tmp.name, 'replay')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_and_get(self):
+        buffer = ReplayBuffer(self.folder, 2, ACTION_SIZE)
+        examples = _examples(1, 5) + _examples(2, 3)
+        buffer.append(examples[:5])
+        buffer.append(examples[5:])
+        self.assertEqual(8, len(buffer))
+
+        boards, pis, vs = buffer.get([7, 0, 5])
+        self.assertEqual(np.int8, boards.dtype)
+        for row, i in enumerate([7, 0, 5]):
+            board, pi, v = examples[i]
+            np.testing.assert_equal(np.array(board), boards[row])
+            np.testing.assert_equal(pi.astype(np.float32), pis[row])
+            self.assertEqual(v, vs[row])
+
+    def test_drop_oldest_and_reopen(self):
+        buffer = ReplayBuffer(self.folder, 2, ACTION_SIZE)
+        for value in (1, 2, 3):
+            buffer.append(_examples(value, value))
+        self.assertEqual(2, buffer.chunk_count)
+        self.assertEqual(5, len(buffer))
+
+        reopened = ReplayBuffer(self.folder, 2, ACTION_SIZE)
+        self.assertEqual(5, len(reopened))
+        boards, _pis, _vs = reopened.get(np.arange(5))
+        self.assertEqual([2, 2, 3, 3, 3], boards[:, 0, 0].tolist())
+        reopened.append(_examples(4, 1))
+        self.assertEqual(4, reopened.examples()[-1][0][0, 0])
+        self.assertEqual(2, len(os.listdir(self.folder)))
+
+    def test_epoch_batches(self):
+        buffer = ReplayBuffer(self.folder, 2, ACTION_SIZE)
+        buffer.append(_examples(1, 7))
+        buffer.append(_examples(2, 4))
+        batches = buffer.epoch_batches(4, np.random.RandomState(0))
+        self.assertEqual([4, 4, 3], [len(batch) for batch in batches])
+        self.assertEqual(list(range(11)), sorted(np.concatenate(batches).tolist()))
+        for batch in batches:
+            self.assertEqual(sorted(batch.tolist()), batch.tolist())
+
+    def test_extend_and_clear(self):
+        source = ReplayBuffer(os.path.join(self.tmp.name, 'source'), 3, ACTION_SIZE)
+        source.append(_examples(1, 2))
+        source.append(_examples(2, 3))
+        buffer = ReplayBuffer(self.folder, 2, ACTION_SIZE)
+        buffer.append(_examples(5, 1))
+        buffer.extend(source)
+        # the oldest chunk is dropped, the source is not changed
+        self.assertEqual(5, len(buffer))
+        self.assertEqual([1, 1, 2, 2, 2], buffer.get(np.arange(5))[0][:, 0, 0].tolist())
+        self.assertEqual(5, len(ReplayBuffer(source.folder, 3, ACTION_SIZE)))
+
+        buffer.clear()
+        self.assertEqual(0, len(buffer))
+        self.assertEqual(0, len(ReplayBuffer(self.folder, 2, ACTION_SIZE)))
+        buffer.append(_examples(3, 1))
+        self.assertEqual(1, len(ReplayBuffer(self.folder, 2, ACTION_SIZE)))
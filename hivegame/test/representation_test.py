@@ -1,8 +1,10 @@
 from engine.hive import Hive
 import engine.hive_representation as represent
+import engine.action_space as action_space
 from unittest import TestCase
 from engine.hive_utils import Player, Direction, HiveException
 import numpy as np
+from hivegame.utils import hexutil
 import os
 import json, sys
 
@@ -92,6 +94,42 @@ class TestRepresentation(TestCase):
         result = represent.two_dim_representation(represent.get_adjacency_state(self.hive))
         np.testing.assert_equal(result, input_list)
 
+    def test_adjacency_matrix(self):
+        np.testing.assert_equal(represent.adjacency_matrix(self.hive), np.zeros((BUG_C, BUG_C - 1)))
+        self.hive.level.append_to(self.hive.get_piece_by_name("wS1"), hexutil.origin)
+        for name, ref_name, direction in (("bS1", "wS1", Direction.HX_E), ("wQ1", "wS1", Direction.HX_SW),
+                                          ("bQ1", "bS1", Direction.HX_NE)):
+            self.hive.level.append_to(self.hive.get_piece_by_name(name), self.hive.poc2cell(ref_name, direction))
+        # beetles on top of each other
+        self.hive.level.append_to(self.hive.get_piece_by_name("bB1"), self.hive.locate("bS1"))
+        self.hive.level.append_to(self.hive.get_piece_by_name("wB1"), self.hive.locate("bS1"))
+        for player in (Player.WHITE, Player.BLACK):
+            self.hive.level.current_player = player
+            expected = represent.two_dim_representation(represent.get_adjacency_state(self.hive))
+            result = represent.adjacency_matrix(self.hive)
+            self.assertEqual(np.int8, result.dtype)
+            np.testing.assert_equal(result, expected)
+            self.assertEqual(represent.string_representation(expected), represent.string_representation(result))
+            expected = represent.two_dim_representation(represent.canonical_adjacency_state(self.hive))
+            np.testing.assert_equal(represent.canonical_adjacency_matrix(self.hive), expected)
+
+    def test_action_space(self):
+        self.assertEqual(len(represent.get_all_action_vector(self.hive)), action_space.ACTION_SIZE)
+        for player in (Player.WHITE, Player.BLACK):
+            for action_number in range(action_space.ACTION_SIZE):
+                atype, decoded = action_space.decode_action(action_number, player)
+                if atype == 'init':
+                    self.assertNotEqual('Q', decoded.kind)
+                    self.assertEqual(action_number, action_space.encode_action(atype, decoded))
+                elif atype == 'place':
+                    self.assertEqual(action_number, action_space.encode_action(atype, *decoded))
+                else:
+                    piece, inner = decoded
+                    self.assertLess(inner, piece.move_vector_size)
+                    self.assertEqual(action_number, action_space.encode_action(atype, piece, None, inner))
+                self.assertEqual(player, (decoded if atype == 'init' else decoded[0]).color)
+        self.assertRaises(HiveException, action_space.decode_action, action_space.ACTION_SIZE, Player.WHITE)
+
     def test_action_vector(self):
         self.hive = Hive.load_state_with_player(self._list_repr, Player.WHITE)
         __location__ = os.path.realpath(
@@ -130,6 +168,21 @@ class TestRepresentation(TestCase):
         self.assertEqual(represent.get_all_action_vector(self.hive)[90], 0)
         self.assertRaises(HiveException, self.hive.action_from_vector, 90)
 
+    def test_hive_state(self):
+        from engine.environment.aienvironment import ai_environment
+        # canonical board of the player to move, and the same position as state
+        board = ai_environment.getInitBoard()
+        state = ai_environment.getInitState()
+        for _ in range(8):
+            np.testing.assert_equal(board, ai_environment.getEncodedBoard(state))
+            valids = ai_environment.getValidMoves(board, 1)
+            np.testing.assert_equal(valids, ai_environment.getValidMoves(state, 1))
+            self.assertEqual(ai_environment.getGameEnded(board, 1), ai_environment.getGameEnded(state, 1))
+            action = [i for i, v in enumerate(valids) if v][-1]
+            board, _ = ai_environment.getNextState(board, 1, action)
+            board = ai_environment.getCanonicalForm(board, -1)
+            state, _ = ai_environment.getNextState(state, 1, action)
+
 
 if __name__ == '__main__':
     import unittest
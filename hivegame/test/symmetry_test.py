@@ -0,0 +1,83 @@
+import json
+import os
+from unittest import TestCase
+
+import numpy as np
+
+from engine.hive import Hive
+import engine.hive_representation as represent
+import engine.action_space as action_space
+import engine.symmetry as symmetry
+from hivegame.engine.environment.aienvironment import ai_environment, HiveState
+from hivegame.utils import hexutil
+from engine.hive_utils import Player
+
+
+def _transformed_hive(hive: Hive, k: int) -> Hive:
+    result = Hive()
+    for cell, stack in hive.level.tiles.items():
+        for piece in stack:
+            result.level.append_to(piece, symmetry.transform_cell(cell, k))
+    result.level.current_player = hive.level.current_player
+    return result
+
+
+def _states(seed):
+    """
+    :return: The states of the beginning of a random game, and of a position where pieces can move
+    """
+    rng = np.random.RandomState(seed)
+    state = ai_environment.getInitState()
+    states = []
+    while not state.game_ended:
+        states.append(state)
+        state = state.next_state(rng.choice(np.flatnonzero(state.valid_moves)))
+    with open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'repr_data.json')) as f:
+        list_repr = np.array(json.load(f)["repr_list"])
+    for player in (Player.WHITE, Player.BLACK):
+        states.append(HiveState(represent.load_state_with_player(list_repr, player)))
+    return states
+
+
+class TestSymmetry(TestCase):
+
+    def test_transform_cell(self):
+        cell = hexutil.Hex(3, -1)
+        self.assertEqual(cell, symmetry.transform_cell(cell, 0))
+        for k in range(symmetry.SYMMETRY_COUNT):
+            neighbours = [symmetry.transform_cell(nb, k) for nb in cell.neighbours()]
+            self.assertEqual(set(symmetry.transform_cell(cell, k).neighbours()), set(neighbours))
+        self.assertEqual(hexutil.Hex(-1, -1), symmetry.transform_cell(hexutil.Hex(-2, 0), 1))
+        self.assertEqual(hexutil.Hex(-1, 1), symmetry.transform_cell(hexutil.Hex(-1, -1), 6))
+
+    def test_symmetric_boards(self):
+        for state in _states(seed=1):
+            boards = symmetry.symmetric_boards(state.board)
+            self.assertEqual((symmetry.SYMMETRY_COUNT,) + state.board.shape, boards.shape)
+            for k in range(symmetry.SYMMETRY_COUNT):
+                expected = represent.canonical_adjacency_matrix(_transformed_hive(state.hive, k))
+                np.testing.assert_equal(expected, boards[k])
+
+    def test_symmetric_policies(self):
+        for state in _states(seed=2):
+            valid = np.flatnonzero(state.valid_moves)
+            policies = symmetry.symmetric_policies(state.valid_moves, state.hive)
+            table = symmetry.policy_table(state.hive)
+            for k in range(symmetry.SYMMETRY_COUNT):
+                hive = _transformed_hive(state.hive, k)
+                np.testing.assert_equal(represent.get_all_action_vector(hive), policies[k])
+                # the actions are mapped to the same actions in the transformed position
+                for action_number in np.flatnonzero(policies[k]):
+                    original = table[k, action_number]
+                    self.assertIn(original, valid)
+                    if action_space.ACTION_TABLE[original, 0] == action_space.INIT:
+                        continue
+                    piece, cell = state.hive.action_from_vector(original)
+                    self.assertEqual((piece, symmetry.transform_cell(cell, k)), hive.action_from_vector(action_number))
+
+    def test_transform_cells(self):
+        cells = [hexutil.Hex(0, 0), hexutil.Hex(3, -1), hexutil.Hex(-4, 2)]
+        images = symmetry.transform_cells(cells)
+        for k in range(symmetry.SYMMETRY_COUNT):
+            self.assertEqual([tuple(symmetry.transform_cell(cell, k)) for cell in cells],
+                             [tuple(image) for image in images[k]])
@@ -1,39 +1,297 @@
-from typing import Set, Optional, Dict
+import copy
+from typing import Set, Optional, Dict, List
 
-from hivegame.utils import hexutil
+from hivegame.utils import hexutil, zobrist
 from engine.hive_utils import Direction, Player
 from hivegame.pieces.piece import HivePiece
 from hivegame.pieces import piece_factory
+from engine.move_generator import MoveCache
 
 import logging
 
 
+# Offsets of the neighbours in the order of Hex.neighbours(): starting from west, clockwise. The mutual neighbours of
+# a cell and its i-th neighbour are its (i-1)-th and (i+1)-th neighbours.
+_NEIGHBOUR_OFFSETS = hexutil.Hex._neighbours
+# Offsets of every cell not further than two steps
+_AREA_OFFSETS = tuple({(dx1 + dx2, dy1 + dy2) for dx1, dy1 in _NEIGHBOUR_OFFSETS + ((0, 0),)
+                       for dx2, dy2 in _NEIGHBOUR_OFFSETS + ((0, 0),)})
+
+
 class GameState(object):
     """Represents the state of the game"""
 
     def __init__(self):
         self.tiles = {}
+        # Reverse index of tiles: piece -> hexagon. Every mutation of tiles should go through the methods below,
+        # otherwise the index becomes stale.
+        self._piece_positions = {}
+        # Zobrist hash of the pieces from white's and from black's point of view. Positions are hashed relative to
+        # the anchor, which is the smallest occupied cell, so that the hash is invariant to translation.
+        self._anchor = None
+        self._hash = 0
+        self._flipped_hash = 0
+        # Cells which can not be left without breaking the one hive rule. Computed lazily, None if outdated.
+        self._pinned = None
+        # Free cells touching the hive, mapped to the cells a piece can slide to from there. A slide to a neighbour
+        # cell is possible if exactly one of the two cells next to both of them is occupied (freedom to move).
+        self._slides = {}
+        # Incrementally updated action vector of each player, see :mod:`engine.move_generator`
+        self._move_caches = {}
+        # For each color: cell -> number of neighbour cells with a piece of that color on top
+        self._touched = {Player.WHITE: {}, Player.BLACK: {}}
+        # Cells where each player can place a piece. Computed lazily, reset on every change.
+        self._placement_cells = {}
         self.current_player = Player.WHITE
 
+    def copy(self) -> 'GameState':
+        """
+        :return: An independent copy of the state. Cached values are shared where they are never modified in place.
+        """
+        result = copy.copy(self)
+        result.tiles = {hexagon: list(pieces) for hexagon, pieces in self.tiles.items()}
+        result._piece_positions = dict(self._piece_positions)
+        result._slides = dict(self._slides)
+        result._move_caches = {player: cache.copy() for player, cache in self._move_caches.items()}
+        result._touched = {color: dict(counts) for color, counts in self._touched.items()}
+        result._placement_cells = dict(self._placement_cells)
+        return result
+
+    def move_cache(self, player: Player) -> MoveCache:
+        """
+        :return: The action vector cache of the player. It is told about every cell changed after this call.
+        """
+        cache = self._move_caches.get(player)
+        if cache is None:
+            cache = self._move_caches[player] = MoveCache()
+        return cache
+
+    def _touch(self, hexagon: hexutil.Hex) -> None:
+        for cache in self._move_caches.values():
+            cache.dirty.add(hexagon)
+        self._placement_cells = {}
+
+    def _update_touched(self, hexagon: hexutil.Hex, old_top: Optional[HivePiece]) -> None:
+        """
+        Updates the touched-by counters of the neighbours after the piece on top of the cell has changed.
+        :param old_top: The piece on top before the change, None if the cell was free
+        """
+        cell = self.tiles.get(hexagon)
+        old_color = old_top.color if old_top else None
+        new_color = cell[-1].color if cell else None
+        if old_color == new_color:
+            return
+        for nb in hexagon.neighbours():
+            if old_color:
+                counts = self._touched[old_color]
+                if counts[nb] == 1:
+                    del counts[nb]
+                else:
+                    counts[nb] -= 1
+            if new_color:
+                counts = self._touched[new_color]
+                counts[nb] = counts.get(nb, 0) + 1
+
+    def touch_count(self, color: Player, hexagon: hexutil.Hex) -> int:
+        """
+        :return: Number of neighbours of the cell with a piece of the given color on top
+        """
+        return self._touched[color].get(hexagon, 0)
+
+    def placement_cells(self, player: Player) -> Set[hexutil.Hex]:
+        """
+        :return: Free cells touching a piece of the player and no piece of the opponent, i.e. where the player can
+                 place a new piece after the first turns. The result is cached until the next change of the board,
+                 it must not be modified.
+        """
+        cells = self._placement_cells.get(player)
+        if cells is None:
+            opponent = Player.BLACK if player == Player.WHITE else Player.WHITE
+            touched_by_opponent = self._touched[opponent]
+            cells = {cell for cell in self._touched[player] if cell not in touched_by_opponent and
+                     cell not in self.tiles}
+            self._placement_cells[player] = cells
+        return cells
+
+    @property
+    def board_hash(self) -> int:
+        """
+        :return: Translation invariant Zobrist hash of the pieces on board. The player to move is not included.
+        """
+        return self._hash
+
+    @property
+    def zobrist_hash(self) -> int:
+        """
+        :return: Translation invariant Zobrist hash of the position including the player to move.
+        """
+        return self._hash ^ zobrist.SIDE_KEY if self.current_player == Player.BLACK else self._hash
+
+    @property
+    def canonical_hash(self) -> int:
+        """
+        :return: Hash of the position from the point of view of the player to move, i.e. the colors are switched
+                 if black is to move. It identifies the same states as the canonical adjacency representation.
+        """
+        return self._flipped_hash if self.current_player == Player.BLACK else self._hash
+
+    @property
+    def anchor(self) -> Optional[hexutil.Hex]:
+        """
+        :return: Reference cell of the translation invariant hash. None if the board is empty.
+        """
+        return self._anchor
+
+    def _toggle_piece_hash(self, piece: HivePiece, hexagon: hexutil.Hex, height: int) -> None:
+        dx = hexagon.x - self._anchor.x
+        dy = hexagon.y - self._anchor.y
+        self._hash ^= zobrist.piece_key(zobrist.piece_index(piece), dx, dy, height)
+        self._flipped_hash ^= zobrist.piece_key(zobrist.flipped_piece_index(piece), dx, dy, height)
+
+    def _rehash(self) -> None:
+        self._hash = 0
+        self._flipped_hash = 0
+        self._anchor = min(self.tiles) if self.tiles else None
+        for hexagon, pieces in self.tiles.items():
+            for height, piece in enumerate(pieces):
+                self._toggle_piece_hash(piece, hexagon, height)
+
     def move_to(self, piece: HivePiece, pos:hexutil.Hex, target_cell: hexutil.Hex) -> None:
-        old_cell = self.tiles.get(pos)
-        assert old_cell  # dangling position
-        old_cell.remove(piece)
-        if not old_cell:  # no more bugs there
-            # remove from dictionary
-            del self.tiles[pos]
-        pieces = self.get_tile_content(target_cell)
-        if not pieces:
-            self.tiles[target_cell] = [piece]
-        else:
-            pieces.append(piece)
+        self.remove_from(piece, pos)
+        self.append_to(piece, target_cell)
 
     def append_to(self, piece: HivePiece, hexagon: hexutil.Hex) -> None:
+        self._touch(hexagon)
         cell = self.tiles.get(hexagon)
         if not cell:
             self.tiles[hexagon] = [piece]
+            self._pinned = None
+            self._update_perimeter(hexagon)
+            self._update_touched(hexagon, None)
         else:
+            old_top = cell[-1]
             cell.append(piece)
+            self._update_touched(hexagon, old_top)
+        self._piece_positions[piece] = hexagon
+        if self._anchor is None or hexagon < self._anchor:
+            self._rehash()
+        else:
+            self._toggle_piece_hash(piece, hexagon, len(self.tiles[hexagon]) - 1)
+
+    def remove_from(self, piece: HivePiece, hexagon: hexutil.Hex) -> None:
+        """
+        Takes the piece off the board.
+        :param piece: Piece to remove
+        :param hexagon: Current position of the piece
+        """
+        old_cell = self.tiles.get(hexagon)
+        assert old_cell  # dangling position
+        self._touch(hexagon)
+        height = old_cell.index(piece)
+        on_top = height == len(old_cell) - 1
+        old_top = old_cell[-1]
+        old_cell.remove(piece)
+        if not old_cell:  # no more bugs there
+            # remove from dictionary
+            del self.tiles[hexagon]
+            self._pinned = None
+            self._update_perimeter(hexagon)
+        self._update_touched(hexagon, old_top)
+        del self._piece_positions[piece]
+        if not on_top or (hexagon == self._anchor and hexagon not in self.tiles):
+            # pieces above have moved down or the anchor cell is gone
+            self._rehash()
+        else:
+            self._toggle_piece_hash(piece, hexagon, height)
+
+    def _slide_targets(self, hexagon: hexutil.Hex, lifted: Optional[hexutil.Hex] = None) -> List[hexutil.Hex]:
+        x, y = hexagon
+        tiles = self.tiles
+        occupied = [(x + dx, y + dy) in tiles and (x + dx, y + dy) != lifted for dx, dy in _NEIGHBOUR_OFFSETS]
+        return [hexutil.Hex(x + dx, y + dy) for i, (dx, dy) in enumerate(_NEIGHBOUR_OFFSETS)
+                if not occupied[i] and occupied[i - 1] != occupied[(i + 1) % 6]]
+
+    def _update_perimeter(self, changed: hexutil.Hex) -> None:
+        """
+        Updates the slide graph after a cell has become occupied or free. Only the edges of cells in two steps
+        distance can change.
+        """
+        x, y = changed
+        for dx, dy in _AREA_OFFSETS:
+            cell = hexutil.Hex(x + dx, y + dy)
+            if cell not in self.tiles and self.occupied_surroundings(cell):
+                self._slides[cell] = self._slide_targets(cell)
+            else:
+                self._slides.pop(cell, None)
+
+    def perimeter(self) -> Set[hexutil.Hex]:
+        """
+        :return: Free cells which are adjacent to at least one occupied cell.
+        """
+        return set(self._slides)
+
+    def slide_moves(self, hexagon: hexutil.Hex, lifted: Optional[hexutil.Hex] = None) -> List[hexutil.Hex]:
+        """
+        Cells which can be reached from the given cell with one sliding step around the hive.
+        :param hexagon: Starting cell
+        :param lifted: Cell of a piece which should be treated as picked up, e.g. the piece which is moving.
+        :return: List of neighbour cells, in the order of :func:`hexutil.Hex.neighbours`
+        """
+        if lifted is not None and hexagon.distance(lifted) <= 1:
+            # the edges next to the picked up piece differ from the cached graph
+            return self._slide_targets(hexagon, lifted)
+        targets = self._slides.get(hexagon)
+        if targets is None:
+            if hexagon in self.tiles:
+                return self._slide_targets(hexagon, lifted)
+            return []  # not touching the hive
+        return list(targets)
+
+    def pinned_cells(self) -> Set[hexutil.Hex]:
+        """
+        :return: Occupied cells which are articulation points of the hive. Removing the bottom piece of such a cell
+                 would break the one hive rule. The result is cached until the next change of the occupied cells.
+        """
+        if self._pinned is None:
+            self._pinned = self._articulation_points()
+        return self._pinned
+
+    def _articulation_points(self) -> Set[hexutil.Hex]:
+        """
+        Iterative version of Hopcroft-Tarjan's articulation point search on the graph of occupied cells.
+        """
+        result = set()
+        if not self.tiles:
+            return result
+        root = next(iter(self.tiles))
+        depth = {root: 0}
+        low = {root: 0}
+        root_children = 0
+        stack = [(root, None, iter(self.occupied_surroundings(root)))]
+        while stack:
+            cell, parent, nbs = stack[-1]
+            for nb in nbs:
+                if nb == parent:
+                    continue
+                if nb in depth:
+                    low[cell] = min(low[cell], depth[nb])
+                else:
+                    depth[nb] = low[nb] = depth[cell] + 1
+                    stack.append((nb, cell, iter(self.occupied_surroundings(nb))))
+                    break
+            else:
+                # every neighbour is explored
+                stack.pop()
+                if parent is None:
+                    continue
+                low[parent] = min(low[parent], low[cell])
+                if parent == root:
+                    root_children += 1
+                elif low[cell] >= depth[parent]:
+                    result.add(parent)
+        if root_children > 1:
+            result.add(root)
+        return result
 
     def move_or_append_to(self, piece: HivePiece, hexagon: hexutil.Hex) -> None:
         pos = self.find_piece_position(piece)
@@ -46,9 +304,8 @@ class GameState(object):
         return self.tiles.get(hexagon)
 
     def is_border(self, hexagon):
-        for hexi in self.tiles.keys():
-            if hexagon in hexi.neighbours():
-                return True
+        if hexagon in self._slides:
+            return True
         # If empty, the start point should behave as a border
         if not self.tiles and hexagon == hexutil.Hex(0, 0):
             return True
@@ -57,11 +314,7 @@ class GameState(object):
     def get_border_tiles(self) -> set:
         if not self.tiles:
             return {hexutil.Hex(0, 0)}
-        neighbours = set()
-        for hexi in self.tiles.keys():
-            neighbours.update(hexi.neighbours())
-        neighbours = neighbours.difference(self.tiles.keys())
-        return neighbours
+        return self.perimeter()
 
     @staticmethod
     def get_direction_to(hex_from: hexutil.Hex, hex_to:hexutil.Hex) -> Optional[Direction]:
@@ -96,9 +349,9 @@ class GameState(object):
         :return: A set of HivePiece items on board.
         """
         if player_color:
-            return set([piece for tile in self.tiles.values() for piece in tile if piece.color == player_color])
+            return {piece for piece in self._piece_positions if piece.color == player_color}
         else:
-            return set([piece for tile in self.tiles.values() for piece in tile])
+            return set(self._piece_positions)
 
     @staticmethod
     def _subset(p_set1, p_set2):
@@ -171,7 +424,4 @@ class GameState(object):
         return not hexagon in self.tiles.keys()
 
     def find_piece_position(self, piece_to_find: HivePiece) -> Optional[hexutil.Hex]:
-        for hexi, pieces in self.tiles.items():
-            if piece_to_find in pieces:
-                return hexi
-        return None
\ No newline at end of file
+        return self._piece_positions.get(piece_to_find)
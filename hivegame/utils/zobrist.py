@@ -0,0 +1,57 @@
+from functools import lru_cache
+
+from engine.hive_utils import Player
+from hivegame.pieces import piece_factory
+from hivegame.pieces.piece import HivePiece
+
+# Zobrist keys of Hive positions.
+#
+# There is no fixed board in Hive, so the keys can not be stored in a pre-generated table indexed by cell. Instead
+# they are derived on demand from (piece, relative cell, stack height) with the splitmix64 mixing function. Cells are
+# taken relative to an anchor cell chosen by the game state, so that translated positions get the same hash.
+
+_MASK = (1 << 64) - 1
+
+_white_names = sorted(str(p) for p in piece_factory.piece_set(Player.WHITE))
+_black_names = sorted(str(p) for p in piece_factory.piece_set(Player.BLACK))
+_piece_indices = {name: i for i, name in enumerate(_white_names + _black_names)}
+
+
+def _splitmix64(value: int) -> int:
+    value = (value + 0x9E3779B97F4A7C15) & _MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK
+    return value ^ (value >> 31)
+
+
+# XORed into the hash when black is to move
+SIDE_KEY = _splitmix64(0xB1ACC)
+
+
+def piece_index(piece: HivePiece) -> int:
+    """
+    :return: Index of the piece in the alphabetically sorted list of all pieces of both players.
+    """
+    return _piece_indices[str(piece)]
+
+
+def flipped_piece_index(piece: HivePiece) -> int:
+    """
+    :return: Index of the piece of the same kind and number, but of the opposite color.
+    """
+    index = _piece_indices[str(piece)]
+    half = len(_white_names)
+    return index + half if index < half else index - half
+
+
+@lru_cache(maxsize=None)
+def piece_key(index: int, dx: int, dy: int, height: int) -> int:
+    """
+    :param index: Index of the piece. See :func:`piece_index`
+    :param dx: x coordinate of the piece relative to the anchor
+    :param dy: y coordinate of the piece relative to the anchor
+    :param height: 0 for pieces on the ground, 1 for a beetle on top of another piece, etc.
+    :return: 64 bit key of the piece at that location
+    """
+    packed = (((index * 8 + height) << 16) | ((dx & 0xFF) << 8) | (dy & 0xFF))
+    return _splitmix64(packed)